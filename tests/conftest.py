@@ -4,6 +4,9 @@ from os import environ
 from pytest import fixture
 
 from toodledo import TokenStorageFile, Toodledo
+from toodledo.task import _TaskSchema
+
+from .fake_server import FakeToodledoServer, TokenStorageMemory
 
 class TokenReadOnly:
 	"""Read the API tokens from an environment variable"""
@@ -20,8 +23,47 @@ class TokenReadOnly:
 		"""Load and return the token. Called by Toodledo class"""
 		return loads(environ[self.name])
 
+def _SeedKnownState(server):
+	"""The same folders, contexts and tasks that the tests expect to find in the live test account"""
+	publicFolderId = server.AddFolder("Test Folder")
+	server.AddFolder("Test Folder - archived", archived=True)
+	privateFolderId = server.AddFolder("Test Folder - private", private=True)
+	privateContextId = server.AddContext("Test Context - private", private=True)
+	publicContextId = server.AddContext("Test Context - public")
+	server.AddTask(title="Test task with private folder", folder=privateFolderId)
+	server.AddTask(title="Test task with public folder", folder=publicFolderId)
+	server.AddTask(title="Test task with private context", context=privateContextId)
+	server.AddTask(title="Test task with public context", context=publicContextId)
+	server.AddTask(title="Test task with star", star=1)
+
+def SchemaLoad(rawTasks):
+	"""Load the raw tasks with the schema, the reference for the fast loader"""
+	schema = _TaskSchema()
+	return [schema.load(x).data for x in rawTasks]
+
+def SchemaDump(tasks):
+	"""Dump the tasks with the schema, the reference for the encoder"""
+	schema = _TaskSchema()
+	return [schema.dump(x).data for x in tasks]
+
+def FakeToodledo(server, **kwargs):
+	"""A Toodledo object which talks to the given FakeToodledoServer"""
+	return Toodledo(clientId="fake", clientSecret="fake", tokenStorage=TokenStorageMemory(server.Token()), scope="basic tasks notes folders write", baseUrl=server.baseUrl, **kwargs)
+
+@fixture
+def fakeServer(monkeypatch):
+	# the stand-in server is plain http
+	monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+	with FakeToodledoServer() as server:
+		yield server
+
 @fixture
-def toodledo():
+def toodledo(request):
+	if "TOODLEDO_CLIENT_ID" not in environ:
+		# no live account so use the stand-in server with the known state
+		server = request.getfixturevalue("fakeServer")
+		_SeedKnownState(server)
+		return FakeToodledo(server)
 	if "TOODLEDO_TOKEN_STORAGE" in environ:
 		tokenStorage = TokenStorageFile(environ["TOODLEDO_TOKEN_STORAGE"])
 	else:
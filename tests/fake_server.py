@@ -0,0 +1,358 @@
+"""Local stand-in for the parts of the Toodledo v3 API that the library uses, for tests and benchmarks that don't need a live account"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from json import dumps, loads
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from time import sleep, time
+from urllib.parse import parse_qsl, urlsplit
+from uuid import uuid4
+
+from .generated_tasks import RawTasks
+
+# the fields every task response contains, whatever was asked for
+_defaultTaskFields = ["id", "title", "modified", "completed"]
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+class FakeToodledoServer: # pylint: disable=too-many-instance-attributes,too-many-public-methods
+	"""Serves the API on a local port from in-memory state. The single-request limits of the real API are enforced.
+	latency is added to every response, throttleEvery makes every nth request fail with a 429 and
+	tooManyRequestsEvery makes every nth request fail with error code 3"""
+
+	def __init__(self, latency=0.0, throttleEvery=0, tooManyRequestsEvery=0):
+		self.latency = latency
+		self.throttleEvery = throttleEvery
+		self.tooManyRequestsEvery = tooManyRequestsEvery
+		self.lock = Lock()
+		self.tasks = {}
+		self.folders = {}
+		self.contexts = {}
+		self.deleted = []
+		self.nextId = 1
+		self.stamp = 0
+		self.lastEditTask = 0
+		self.lastDeleteTask = 0
+		self.lastEditFolder = 0
+		self.lastEditContext = 0
+		self.accessTokens = set()
+		self.requestCount = 0
+		self.requestsByPath = {}
+		self.bytesReceived = 0
+		self.bytesSent = 0
+		self.server = None
+		self.thread = None
+
+	def __enter__(self):
+		self.Start()
+		return self
+
+	def __exit__(self, *args):
+		self.Stop()
+
+	def Start(self):
+		"""Start serving on a free port in a background thread"""
+		server = self
+
+		class _Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+			# the headers and body are separate writes so without this, delayed acks add 40ms to each response
+			disable_nagle_algorithm = True
+
+			def do_GET(self): # pylint: disable=invalid-name
+				server._Handle(self) # pylint: disable=protected-access
+
+			def do_POST(self): # pylint: disable=invalid-name
+				server._Handle(self) # pylint: disable=protected-access
+
+			def log_message(self, *args): # pylint: disable=arguments-differ
+				pass
+
+		self.server = _ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+		self.thread = Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+		self.thread.start()
+
+	def Stop(self):
+		"""Stop serving"""
+		self.server.shutdown()
+		self.server.server_close()
+		self.thread.join()
+
+	@property
+	def baseUrl(self):
+		"""The URL to pass to Toodledo as its baseUrl"""
+		return "http://127.0.0.1:{}/3/".format(self.server.server_address[1])
+
+	def Token(self):
+		"""Issue a new token, in the same format as the real token endpoint"""
+		accessToken = str(uuid4())
+		with self.lock:
+			self.accessTokens.add(accessToken)
+		return {"access_token": accessToken, "refresh_token": str(uuid4()), "token_type": "Bearer", "expires_in": 7200, "expires_at": time() + 7200, "scope": "basic tasks notes folders write"}
+
+	def _Stamp(self):
+		# strictly increasing so that changes in the same second are still seen as newer
+		self.stamp = max(int(time()), self.stamp + 1)
+		return self.stamp
+
+	def _NewId(self):
+		id_ = self.nextId
+		self.nextId += 1
+		return id_
+
+	def SeedTasks(self, count, seed=0):
+		"""Add count generated tasks"""
+		with self.lock:
+			folderIds = list(self.folders.keys()) + [0]
+			contextIds = list(self.contexts.keys()) + [0]
+			for rawTask in RawTasks(count, seed=seed, firstId=self.nextId):
+				rawTask["folder"] = folderIds[rawTask["id"] % len(folderIds)]
+				rawTask["context"] = contextIds[rawTask["id"] % len(contextIds)]
+				rawTask["parent"] = 0
+				self.tasks[rawTask["id"]] = rawTask
+			self.nextId += count
+			self.lastEditTask = self._Stamp()
+
+	def AddTask(self, **fields):
+		"""Add a task with the given API fields directly and return its id"""
+		with self.lock:
+			return self._AddTask(fields)["id"]
+
+	def AddFolder(self, name, private=False, archived=False):
+		"""Add a folder directly and return its id"""
+		with self.lock:
+			return self._AddFolder({"name": name, "private": int(private), "archived": int(archived)})["id"]
+
+	def AddContext(self, name, private=False):
+		"""Add a context directly and return its id"""
+		with self.lock:
+			return self._AddContext({"name": name, "private": int(private)})["id"]
+
+	def _Handle(self, request):
+		url = urlsplit(request.path)
+		params = dict(parse_qsl(url.query, keep_blank_values=True))
+		length = int(request.headers.get("Content-Length", 0))
+		body = request.rfile.read(length) if length > 0 else b""
+		if body and request.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+			params.update(parse_qsl(body.decode(), keep_blank_values=True))
+		path = url.path[len("/3/"):]
+
+		with self.lock:
+			self.requestCount += 1
+			self.requestsByPath[path] = self.requestsByPath.get(path, 0) + 1
+			self.bytesReceived += len(request.requestline) + length
+			requestNumber = self.requestCount
+		if self.latency > 0:
+			sleep(self.latency)
+
+		status = 200
+		if path == "account/token.php":
+			response = self.Token()
+		elif self.throttleEvery > 0 and requestNumber % self.throttleEvery == 0:
+			status, response = 429, {"errorCode": 3, "errorDesc": "Too many requests"}
+		elif self.tooManyRequestsEvery > 0 and requestNumber % self.tooManyRequestsEvery == 0:
+			response = {"errorCode": 3, "errorDesc": "Too many API requests"}
+		elif request.headers.get("Authorization", "")[len("Bearer "):] not in self.accessTokens:
+			response = {"errorCode": 2, "errorDesc": "Invalid token"}
+		else:
+			handler = self._handlers.get(path)
+			if handler is None:
+				status, response = 404, {"errorCode": 0, "errorDesc": "Unknown endpoint"}
+			else:
+				with self.lock:
+					response = handler(self, params)
+
+		content = dumps(response).encode()
+		with self.lock:
+			self.bytesSent += len(content)
+		request.send_response(status)
+		request.send_header("Content-Type", "application/json")
+		request.send_header("Content-Length", str(len(content)))
+		request.end_headers()
+		request.wfile.write(content)
+
+	def _GetAccount(self, _):
+		return {"userid": "fake", "alias": "Fake", "lastedit_task": self.lastEditTask, "lastdelete_task": self.lastDeleteTask,
+			"lastedit_folder": self.lastEditFolder, "lastedit_context": self.lastEditContext}
+
+	@staticmethod
+	def _Project(rawTask, fields):
+		return {name: rawTask[name] for name in _defaultTaskFields + fields if name in rawTask}
+
+	def _GetTasks(self, params):
+		start = int(params.get("start", 0))
+		num = min(int(params.get("num", 1000)), 1000)
+		fields = [x for x in params.get("fields", "").split(",") if x != ""]
+		matching = list(self.tasks.values())
+		if "id" in params:
+			matching = [x for x in matching if x["id"] == int(params["id"])]
+		if "comp" in params and params["comp"] != "-1":
+			wantCompleted = params["comp"] == "1"
+			matching = [x for x in matching if (x.get("completed", 0) != 0) == wantCompleted]
+		if "modafter" in params:
+			matching = [x for x in matching if x["modified"] > int(params["modafter"])]
+		if "modbefore" in params:
+			matching = [x for x in matching if x["modified"] < int(params["modbefore"])]
+		page = [self._Project(x, fields) for x in matching[start:start + num]]
+		return [{"num": len(page), "total": len(matching)}] + page
+
+	def _GetDeletedTasks(self, params):
+		after = int(params.get("after", 0))
+		deleted = [{"id": id_, "stamp": stamp} for id_, stamp in self.deleted if stamp > after]
+		return [{"num": len(deleted)}] + deleted
+
+	def _AddTask(self, fields):
+		rawTask = {"title": "", "tag": "", "startdate": 0, "duedate": 0, "completed": 0, "star": 0, "priority": 0, "duedatemod": 0,
+			"status": 0, "length": 0, "note": "", "repeat": "", "parent": 0, "folder": 0, "context": 0}
+		rawTask.update(fields)
+		rawTask["id"] = self._NewId()
+		rawTask["modified"] = self.lastEditTask = self._Stamp()
+		self.tasks[rawTask["id"]] = rawTask
+		return rawTask
+
+	def _WriteBatch(self, params):
+		# the common checks for a batch of task writes
+		try:
+			items = loads(params.get("tasks", ""))
+		except ValueError:
+			return None, {"errorCode": 611, "errorDesc": "Malformed request"}
+		if len(items) > 50:
+			return None, {"errorCode": 602, "errorDesc": "Only 50 tasks can be added/edited/deleted at a time"}
+		return items, None
+
+	def _AddTasks(self, params):
+		items, failure = self._WriteBatch(params)
+		if failure is not None:
+			return failure
+		fields = [x for x in params.get("fields", "").split(",") if x != ""]
+		results = []
+		for item in items:
+			if item.get("title", "") == "":
+				results.append({"errorCode": 601, "errorDesc": "Your task must have a title.", "ref": item.get("ref", "")})
+			elif len(self.tasks) >= 20000:
+				results.append({"errorCode": 603, "errorDesc": "The maximum number of tasks allowed per account (20000) has been reached", "ref": item.get("ref", "")})
+			else:
+				results.append(self._Project(self._AddTask(item), fields))
+		return results
+
+	def _EditTasks(self, params):
+		items, failure = self._WriteBatch(params)
+		if failure is not None:
+			return failure
+		results = []
+		for item in items:
+			rawTask = self.tasks.get(item.get("id"))
+			if rawTask is None:
+				results.append({"id": item.get("id"), "errorCode": 605, "errorDesc": "Invalid task"})
+				continue
+			edits = {name: value for name, value in item.items() if name not in ("id", "modified")}
+			rawTask.update(edits)
+			rawTask["modified"] = self.lastEditTask = self._Stamp()
+			results.append(self._Project(rawTask, list(edits.keys())))
+		return results
+
+	def _DeleteTasks(self, params):
+		items, failure = self._WriteBatch(params)
+		if failure is not None:
+			return failure
+		results = []
+		for id_ in items:
+			if self.tasks.pop(id_, None) is None:
+				results.append({"id": id_, "errorCode": 605, "errorDesc": "Invalid task"})
+				continue
+			self.lastDeleteTask = self._Stamp()
+			self.deleted.append((id_, self.lastDeleteTask))
+			results.append(id_)
+		return results
+
+	def _AddFolder(self, params):
+		folder = {"id": self._NewId(), "name": params["name"], "private": int(params.get("private", 0)), "archived": int(params.get("archived", 0)), "ord": len(self.folders) + 1}
+		self.folders[folder["id"]] = folder
+		self.lastEditFolder = self._Stamp()
+		return folder
+
+	def _AddFolders(self, params):
+		if params.get("name", "") == "":
+			return {"errorCode": 201, "errorDesc": "Your folder must have a name."}
+		if any(x["name"] == params["name"] for x in self.folders.values()):
+			return {"errorCode": 202, "errorDesc": "A folder with that name already exists."}
+		return [self._AddFolder(params)]
+
+	def _EditFolder(self, params):
+		folder = self.folders.get(int(params.get("id", 0)))
+		if folder is None:
+			return {"errorCode": 205, "errorDesc": "Invalid folder."}
+		for name in ("name", "private", "archived", "ord"):
+			if name in params:
+				folder[name] = params[name] if name == "name" else int(params[name])
+		self.lastEditFolder = self._Stamp()
+		return [folder]
+
+	def _DeleteFolder(self, params):
+		id_ = int(params.get("id", 0))
+		if self.folders.pop(id_, None) is None:
+			return {"errorCode": 205, "errorDesc": "Invalid folder."}
+		self.lastEditFolder = self._Stamp()
+		return {"deleted": id_}
+
+	def _AddContext(self, params):
+		context = {"id": self._NewId(), "name": params["name"], "private": int(params.get("private", 0))}
+		self.contexts[context["id"]] = context
+		self.lastEditContext = self._Stamp()
+		return context
+
+	def _AddContexts(self, params):
+		if params.get("name", "") == "":
+			return {"errorCode": 301, "errorDesc": "Your context must have a name."}
+		if any(x["name"] == params["name"] for x in self.contexts.values()):
+			return {"errorCode": 302, "errorDesc": "A context with that name already exists."}
+		return [self._AddContext(params)]
+
+	def _EditContext(self, params):
+		context = self.contexts.get(int(params.get("id", 0)))
+		if context is None:
+			return {"errorCode": 305, "errorDesc": "Invalid context."}
+		for name in ("name", "private"):
+			if name in params:
+				context[name] = params[name] if name == "name" else int(params[name])
+		self.lastEditContext = self._Stamp()
+		return [context]
+
+	def _DeleteContext(self, params):
+		id_ = int(params.get("id", 0))
+		if self.contexts.pop(id_, None) is None:
+			return {"errorCode": 305, "errorDesc": "Invalid context."}
+		self.lastEditContext = self._Stamp()
+		return {"deleted": id_}
+
+	_handlers = {
+		"account/get.php": _GetAccount,
+		"tasks/get.php": _GetTasks,
+		"tasks/deleted.php": _GetDeletedTasks,
+		"tasks/add.php": _AddTasks,
+		"tasks/edit.php": _EditTasks,
+		"tasks/delete.php": _DeleteTasks,
+		"folders/get.php": lambda self, _: list(self.folders.values()),
+		"folders/add.php": _AddFolders,
+		"folders/edit.php": _EditFolder,
+		"folders/delete.php": _DeleteFolder,
+		"contexts/get.php": lambda self, _: list(self.contexts.values()),
+		"contexts/add.php": _AddContexts,
+		"contexts/edit.php": _EditContext,
+		"contexts/delete.php": _DeleteContext
+	}
+
+class TokenStorageMemory:
+	"""Keeps the token in memory"""
+
+	def __init__(self, token):
+		self.token = token
+
+	def Save(self, token):
+		"""Save the given token"""
+		self.token = token
+
+	def Load(self):
+		"""Return the token"""
+		return self.token
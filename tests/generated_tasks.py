@@ -0,0 +1,33 @@
+"""Deterministic raw task dictionaries in the API's format, for tests that don't need a live account"""
+
+from random import Random
+
+_noon = 12 * 60 * 60
+
+def RawTask(id_, random):
+	"""A task with every field filled in, some with their unset values"""
+	day = 1546300800 + random.randrange(365) * 24 * 60 * 60 + _noon
+	return {
+		"id": id_,
+		"title": "Task {}".format(id_),
+		"tag": random.choice(["", "a", "a, b", "work, home, errands"]),
+		"startdate": random.choice([0, day]),
+		"duedate": random.choice([0, day + 7 * 24 * 60 * 60]),
+		"modified": 1546300800 + random.randrange(10000000),
+		"completed": random.choice([0, 0, 0, day]),
+		"star": random.randrange(2),
+		"priority": random.randrange(-1, 4),
+		"duedatemod": random.randrange(4),
+		"status": random.randrange(11),
+		"length": random.randrange(120),
+		"note": random.choice(["", "A short note", "A long note\n" * 20]),
+		"repeat": random.choice(["", "FREQ=WEEKLY", "FREQ=YEARLY"]),
+		"parent": random.choice([0, 0, 0, 1]),
+		"folder": random.choice([0, 1001, 1002, 1003]),
+		"context": random.choice([0, 2001, 2002])
+	}
+
+def RawTasks(count, seed=0, firstId=1):
+	"""A list of count raw tasks"""
+	random = Random(seed)
+	return [RawTask(id_, random) for id_ in range(firstId, firstId + count)]
@@ -0,0 +1,85 @@
+from threading import Lock
+
+from toodledo import AccountSync, RateLimiter, Task
+from toodledo.accounts import _FairQueue
+
+from .fake_server import TokenStorageMemory
+
+def _Accounts(server, count, **kwargs):
+	storages = {"user{}".format(x): TokenStorageMemory(server.Token()) for x in range(count)}
+	return AccountSync("fake", "fake", storages, "basic tasks notes folders write", baseUrl=server.baseUrl, **kwargs)
+
+def test_sync_all_accounts(fakeServer):
+	fakeServer.SeedTasks(30)
+	fakeServer.AddFolder("Shared folder")
+	limiter = RateLimiter(rate=1000.0, burst=100)
+	accounts = _Accounts(fakeServer, 6, maxWorkers=4, rateLimiter=limiter, accountRate=100.0)
+	results = accounts.Sync(params={"fields": "note"})
+	assert sorted(results) == sorted(accounts.accounts)
+	for result in results.values():
+		assert result.errors == {}
+		assert len(result.tasks) == 30
+		assert [x.name for x in result.folders] == ["Shared folder"]
+		assert result.contexts == []
+		assert result.account is not None
+	assert limiter.Metrics()["requests"] == 6 * 4
+	# one connection pool for everyone
+	assert all(x._Session().get_adapter(fakeServer.baseUrl) is accounts.adapter for x in accounts.accounts.values()) # pylint: disable=protected-access
+	accounts.Close()
+
+def test_failed_account_does_not_stop_the_others(fakeServer):
+	accounts = _Accounts(fakeServer, 3)
+	accounts.accounts["user1"].tokenStorage = TokenStorageMemory(None)
+	results = accounts.Sync(reads=("tasks",))
+	assert set(results["user1"].errors) == {"tasks"}
+	assert results["user0"].tasks == [] and results["user2"].errors == {}
+
+	accounts.accounts["user0"].AddTasks([Task(title="Only mine")])
+	assert [x.title for x in accounts.Sync(reads=("tasks",), keys=["user2"])["user2"].tasks] == ["Only mine"]
+
+def test_fair_queue():
+	queue = _FairQueue({"busy": ["a", "b", "c"], "quiet": ["x"], "none": []}, 1)
+	assert queue.Take() == ("busy", "a")
+	assert queue.Take() == ("quiet", "x")
+	queue.Done("busy")
+	assert queue.Take() == ("busy", "b")
+	queue.Done("busy")
+	queue.Done("quiet")
+	assert queue.Take() == ("busy", "c")
+	assert queue.Take() is None
+
+def test_per_account_concurrency(fakeServer, monkeypatch):
+	fakeServer.latency = 0.02
+	accounts = _Accounts(fakeServer, 4, maxWorkers=8, maxPerAccount=1)
+	lock = Lock()
+	running = {}
+	peak = {}
+	original = AccountSync._Read # pylint: disable=protected-access
+	def _Read(toodledo, read, params, result):
+		with lock:
+			running[toodledo] = running.get(toodledo, 0) + 1
+			peak[toodledo] = max(peak.get(toodledo, 0), running[toodledo])
+		try:
+			original(toodledo, read, params, result)
+		finally:
+			with lock:
+				running[toodledo] -= 1
+	monkeypatch.setattr(AccountSync, "_Read", staticmethod(_Read))
+	accounts.Sync()
+	assert set(peak.values()) == {1}
+
+def test_accounts_are_independent(fakeServer):
+	limiter = RateLimiter(rate=1000.0, burst=100)
+	accounts = _Accounts(fakeServer, 2, rateLimiter=limiter)
+	throttled, other = accounts.accounts["user0"], accounts.accounts["user1"]
+	throttled.rateLimiter.OnThrottle()
+	assert limiter.Metrics()["throttleEvents"] == 0
+	assert other.rateLimiter.limiters[0].Metrics()["throttleEvents"] == 0
+	assert throttled.rateLimiter.limiters[0].Metrics()["throttleEvents"] == 1
+
+	# closing one account leaves the shared connection pool open for the others
+	throttled.GetTasks(params={})
+	throttled.Close()
+	assert len(accounts.adapter.poolmanager.pools) > 0
+	assert other.GetTasks(params={}) == []
+	accounts.Close()
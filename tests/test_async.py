@@ -0,0 +1,94 @@
+from asyncio import new_event_loop
+from uuid import uuid4
+
+from pytest import importorskip, raises
+
+from toodledo import AsyncToodledo, Context, Folder, RateLimiter, Task
+
+from .fake_server import TokenStorageMemory
+
+def _Run(coroutine):
+	loop = new_event_loop()
+	try:
+		return loop.run_until_complete(coroutine)
+	finally:
+		loop.close()
+
+def _AsyncToodledo(toodledo):
+	return AsyncToodledo(toodledo.clientId, toodledo.clientSecret, toodledo.tokenStorage, toodledo.scope, baseUrl=toodledo.baseUrl)
+
+def _FakeAsyncToodledo(server, **kwargs):
+	return AsyncToodledo("fake", "fake", TokenStorageMemory(server.Token()), "basic tasks notes folders write", baseUrl=server.baseUrl, **kwargs)
+
+def test_async_read(toodledo):
+	importorskip("aiohttp")
+	async def _Read():
+		async with _AsyncToodledo(toodledo) as asyncToodledo:
+			_ = await asyncToodledo.GetAccount()
+			return await asyncToodledo.GetTasks(params={}, parallel=True), await asyncToodledo.GetFolders()
+	tasks, folders = _Run(_Read())
+	assert [t.id_ for t in tasks] == [t.id_ for t in toodledo.GetTasks(params={})]
+	assert [f.id_ for f in folders] == [f.id_ for f in toodledo.GetFolders()]
+
+def test_async_add_delete(toodledo):
+	importorskip("aiohttp")
+	randomTitle = str(uuid4())
+	async def _AddDelete():
+		async with _AsyncToodledo(toodledo) as asyncToodledo:
+			results = await asyncToodledo.AddTasks([Task(title=randomTitle)])
+			tasks = [t for t in await asyncToodledo.GetTasks(params={}) if t.id_ == results[0].id_]
+			await asyncToodledo.DeleteTasks(tasks)
+			return tasks
+	tasks = _Run(_AddDelete())
+	assert len(tasks) == 1
+	assert tasks[0].title == randomTitle
+	assert len([t for t in toodledo.GetTasks(params={}) if t.title == randomTitle]) == 0
+
+def test_async_folder_context_writes(fakeServer):
+	importorskip("aiohttp")
+	async def _Write():
+		async with _FakeAsyncToodledo(fakeServer) as asyncToodledo:
+			folder = await asyncToodledo.AddFolder(Folder(name="Async folder", private=False))
+			folder.name = "Async folder renamed"
+			folder.archived = True
+			edited = await asyncToodledo.EditFolder(folder)
+			context = await asyncToodledo.AddContext(Context(name="Async context", private=True))
+			context.name = "Async context renamed"
+			editedContext = await asyncToodledo.EditContext(context)
+			afterEdits = await asyncToodledo.GetFolders(), await asyncToodledo.GetContexts()
+			await asyncToodledo.DeleteFolder(folder)
+			await asyncToodledo.DeleteContext(context)
+			return edited, editedContext, afterEdits, await asyncToodledo.GetFolders(), await asyncToodledo.GetContexts()
+	edited, editedContext, (folders, contexts), foldersAfter, contextsAfter = _Run(_Write())
+	assert (edited.name, edited.archived) == ("Async folder renamed", True)
+	assert (editedContext.name, editedContext.private) == ("Async context renamed", True)
+	assert [x.name for x in folders] == ["Async folder renamed"]
+	assert [x.name for x in contexts] == ["Async context renamed"]
+	assert foldersAfter == [] and contextsAfter == []
+
+def test_async_retries_when_throttled(fakeServer):
+	importorskip("aiohttp")
+	fakeServer.SeedTasks(3)
+	async def _Read(asyncToodledo, count):
+		async with asyncToodledo:
+			return [await asyncToodledo.GetTasks(params={}) for _ in range(count)]
+
+	# without a rate limiter, a 429 refreshes the token and retries once
+	fakeServer.throttleEvery = 3
+	results = _Run(_Read(_FakeAsyncToodledo(fakeServer), 3))
+	assert [len(x) for x in results] == [3, 3, 3]
+	assert fakeServer.requestsByPath["account/token.php"] == 1
+
+	# with one, it backs off and keeps trying
+	limiter = RateLimiter(rate=1000, burst=100, maxRate=1000)
+	fakeServer.throttleEvery = 2
+	fakeServer.tooManyRequestsEvery = 5
+	results = _Run(_Read(_FakeAsyncToodledo(fakeServer, rateLimiter=limiter), 4))
+	assert [len(x) for x in results] == [3, 3, 3, 3]
+	assert limiter.Metrics()["throttleEvents"] > 0
+
+	# and gives up with the last 429 once it runs out of retries
+	from aiohttp import ClientResponseError # pylint: disable=import-outside-toplevel
+	fakeServer.throttleEvery = 1
+	with raises(ClientResponseError):
+		_Run(_Read(_FakeAsyncToodledo(fakeServer), 1))
@@ -0,0 +1,114 @@
+from tracemalloc import get_traced_memory, start, stop
+
+from pytest import importorskip
+
+from toodledo import Task
+from toodledo.frame import _TasksFrame
+from toodledo.task import _LoadTaskList, _TaskEncoder
+
+from .conftest import FakeToodledo, SchemaDump, SchemaLoad
+from .generated_tasks import RawTasks
+
+# the benchmark fixture comes from pytest-benchmark
+importorskip("pytest_benchmark")
+
+# simulated round trip time to the API
+_latency = 0.01
+_rounds = 3
+
+def _PeakMemory(function, *args):
+	start()
+	try:
+		function(*args)
+		return get_traced_memory()[1]
+	finally:
+		stop()
+
+def _Measure(benchmark, server, function, args, taskCount, setup=None): # pylint: disable=too-many-arguments
+	"""Benchmark the function and record requests/sec, tasks/sec and peak memory alongside the timings.
+	setup is called before each round, untimed"""
+	def _Setup():
+		if setup is not None:
+			setup()
+		return args, {}
+
+	requestCount = server.requestCount if server is not None else 0
+	result = benchmark.pedantic(function, setup=_Setup, rounds=_rounds, iterations=1)
+	if benchmark.stats is not None: # None when benchmarking is disabled
+		seconds = benchmark.stats.stats.mean
+		if server is not None:
+			benchmark.extra_info["requestsPerSecond"] = (server.requestCount - requestCount) / _rounds / seconds
+		benchmark.extra_info["tasksPerSecond"] = taskCount / seconds
+		_Setup()
+		benchmark.extra_info["peakMemoryBytes"] = _PeakMemory(function, *args)
+	return result
+
+def test_load_tasks_with_schema(benchmark):
+	rawTasks = RawTasks(5000)
+	tasks = _Measure(benchmark, None, SchemaLoad, (rawTasks,), len(rawTasks))
+	assert len(tasks) == len(rawTasks)
+
+def test_load_tasks_fast(benchmark):
+	rawTasks = RawTasks(5000)
+	tasks = _Measure(benchmark, None, _LoadTaskList, (rawTasks,), len(rawTasks))
+	assert len(tasks) == len(rawTasks)
+
+def test_load_tasks_frame(benchmark):
+	importorskip("pandas")
+	rawTasks = RawTasks(5000)
+	frame = _Measure(benchmark, None, _TasksFrame, (rawTasks,), len(rawTasks))
+	assert len(frame) == len(rawTasks)
+
+def test_dump_tasks(benchmark):
+	tasks = _LoadTaskList(RawTasks(5000))
+	dumped = _Measure(benchmark, None, SchemaDump, (tasks,), len(tasks))
+	assert len(dumped) == len(tasks)
+
+def test_encode_tasks(benchmark):
+	tasks = _LoadTaskList(RawTasks(5000))
+	encoded = _Measure(benchmark, None, _TaskEncoder(), (tasks,), len(tasks))
+	assert len(encoded) == len(tasks)
+
+def _GetTasksBenchmark(benchmark, fakeServer, parallel):
+	fakeServer.SeedTasks(10000)
+	fakeServer.latency = _latency
+	toodledo = FakeToodledo(fakeServer)
+	tasks = _Measure(benchmark, fakeServer, lambda: toodledo.GetTasks(params={"fields": "tag,duedate,status,priority,note"}, parallel=parallel), (), 10000)
+	assert len(tasks) == 10000
+
+def test_get_tasks_serial(benchmark, fakeServer):
+	_GetTasksBenchmark(benchmark, fakeServer, False)
+
+def test_get_tasks_parallel(benchmark, fakeServer):
+	_GetTasksBenchmark(benchmark, fakeServer, True)
+
+def _AddTasksBenchmark(benchmark, fakeServer, parallel):
+	fakeServer.latency = _latency
+	toodledo = FakeToodledo(fakeServer)
+	tasks = [Task(title="Benchmark task {}".format(x), note="A note\n" * 10, tags=["a", "b"]) for x in range(500)]
+	results = _Measure(benchmark, fakeServer, lambda: toodledo.AddTasks(tasks, parallel=parallel), (), len(tasks))
+	assert len(results) == len(tasks)
+
+def test_add_tasks_serial(benchmark, fakeServer):
+	_AddTasksBenchmark(benchmark, fakeServer, False)
+
+def test_add_tasks_parallel(benchmark, fakeServer):
+	_AddTasksBenchmark(benchmark, fakeServer, True)
+
+def test_edit_tasks_parallel(benchmark, fakeServer):
+	fakeServer.SeedTasks(500)
+	toodledo = FakeToodledo(fakeServer)
+	tasks = toodledo.GetTasks(params={})
+	rounds = []
+
+	def _Edit():
+		# EditTasks marks the tasks clean so each round needs fresh changes
+		rounds.append(None)
+		for task in tasks:
+			task.title = "Benchmark task {} edit {}".format(task.id_, len(rounds))
+
+	fakeServer.latency = _latency
+	results = _Measure(benchmark, fakeServer, lambda: toodledo.EditTasks(tasks, parallel=True), (), len(tasks), setup=_Edit)
+	assert len(results) == len(tasks) and not any(x.IsError() for x in results)
+	# 50 tasks per request
+	assert fakeServer.requestsByPath["tasks/edit.php"] == len(rounds) * len(tasks) // 50
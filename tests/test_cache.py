@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from pytest import mark
+
+from toodledo import CachedState, Context, Folder, Priority, Status, Task, TaskCacheFile, TaskCacheSqlite, TaskSync
+
+@mark.parametrize("cacheType", [TaskCacheFile, TaskCacheSqlite])
+def test_round_trip(tmpdir, cacheType):
+	cache = cacheType(str(tmpdir.join("cache")))
+	assert cache.Load() is None
+
+	fullTask = Task(id_=1, title="Full", tags=["a", "b"], startDate=None, dueDate=date(2019, 1, 2), modified=datetime(2019, 1, 1, 12, 30),
+		completedDate=None, star=True, priority=Priority.HIGH, status=Status.WAITING, length=5, note="Note", folderId=None, contextId=3)
+	partialTask = Task(id_=2, title="Partial", modified=datetime(2019, 1, 1))
+	state = CachedState(tasks=[fullTask, partialTask], folders=[Folder(id_=3, name="Folder", private=False, archived=False, order=1)],
+		contexts=[Context(id_=4, name="Context", private=True)], lastEditTask=datetime(2019, 1, 1, 12, 30))
+	cache.Save(state)
+
+	loaded = cache.Load()
+	assert [repr(x) for x in loaded.tasks] == [repr(x) for x in state.tasks]
+	assert not hasattr(loaded.tasks[1], "dueDate")
+	assert all(type(x) is Task for x in loaded.tasks) # pylint: disable=unidiomatic-typecheck
+	assert type(loaded.folders[0]) is Folder # pylint: disable=unidiomatic-typecheck
+	assert not loaded.tasks[0].IsDirty()
+	loaded.tasks[0].star = False
+	assert loaded.tasks[0].DirtyFields() == {"star"}
+	assert [repr(x) for x in loaded.folders] == [repr(x) for x in state.folders]
+	assert [repr(x) for x in loaded.contexts] == [repr(x) for x in state.contexts]
+	assert loaded.lastEditTask == state.lastEditTask
+	assert loaded.lastDeleteTask is None
+
+def test_sync_with_cache(toodledo, tmpdir):
+	cache = TaskCacheFile(str(tmpdir.join("cache")))
+	sync = TaskSync(toodledo, cache=cache, syncFolders=True, syncContexts=True)
+	sync.Sync()
+
+	cachedSync = TaskSync(toodledo, cache=cache, syncFolders=True, syncContexts=True)
+	assert set(cachedSync.tasks.keys()) == set(sync.tasks.keys())
+	assert [x.name for x in cachedSync.folders] == [x.name for x in sync.folders]
+	edited, deletedIds = cachedSync.Sync()
+	assert edited == []
+	assert deletedIds == []
@@ -2,6 +2,8 @@ from uuid import uuid4
 
 from toodledo import Context
 
+from .conftest import FakeToodledo
+
 # There's no export for these in the toodledo web interface so the user will have to make them themselves
 def test_get_known_contexts(toodledo):
 	contexts = toodledo.GetContexts()
@@ -39,3 +41,13 @@ def test_add_edit_delete_folder(toodledo):
 	assert ourContext.private == newContext.private
 
 	toodledo.DeleteContext(editedContext)
+
+def test_context_lookup(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	added = toodledo.AddContext(Context(name="Lookup context", private=False))
+	assert toodledo.ContextByName("Lookup context").id_ == added.id_
+	contexts = toodledo.GetContexts()
+	assert toodledo.ContextById(added.id_) in contexts
+	toodledo.DeleteContext(added)
+	assert toodledo.ContextByName("Lookup context") is None
+	assert fakeServer.requestsByPath["contexts/get.php"] == 2
@@ -2,6 +2,8 @@ from uuid import uuid4
 
 from toodledo import Folder
 
+from .conftest import FakeToodledo
+
 # There's no export for these in the toodledo web interface so the user will have to make them themselves
 def test_get_known_folders(toodledo):
 	folders = toodledo.GetFolders()
@@ -50,3 +52,36 @@ def test_add_edit_delete_folder(toodledo):
 	assert ourFolder.archived == newFolder.archived
 
 	toodledo.DeleteFolder(editedFolder)
+
+def test_folder_lookup(fakeServer):
+	fakeServer.AddFolder("Lookup folder")
+	toodledo = FakeToodledo(fakeServer)
+	folder = toodledo.FolderByName("Lookup folder")
+	assert folder is not None
+	assert toodledo.FolderById(folder.id_) is folder
+	assert toodledo.FolderByName("Missing") is None
+	# answered from the cache
+	assert fakeServer.requestsByPath["folders/get.php"] == 1
+
+	added = toodledo.AddFolder(Folder(name="Added", private=False))
+	assert toodledo.FolderById(added.id_).name == "Added"
+	added.name = "Renamed"
+	toodledo.EditFolder(added)
+	assert toodledo.FolderByName("Added") is None
+	assert toodledo.FolderByName("Renamed").id_ == added.id_
+	toodledo.DeleteFolder(added)
+	assert toodledo.FolderById(added.id_) is None
+	assert fakeServer.requestsByPath["folders/get.php"] == 1
+
+	# changed behind our back
+	fakeServer.AddFolder("Elsewhere")
+	assert toodledo.FolderByName("Elsewhere") is None
+	toodledo.InvalidateLookups()
+	assert toodledo.FolderByName("Elsewhere") is not None
+	assert fakeServer.requestsByPath["folders/get.php"] == 2
+
+def test_folder_lookup_expires(fakeServer):
+	toodledo = FakeToodledo(fakeServer, lookupTtl=0)
+	toodledo.FolderByName("Anything")
+	toodledo.FolderByName("Anything")
+	assert fakeServer.requestsByPath["folders/get.php"] == 2
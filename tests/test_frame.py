@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+from pytest import importorskip
+
+from toodledo.frame import _TasksFrame, _TasksTable
+from toodledo.task import _LoadTaskList
+
+from .conftest import FakeToodledo
+from .generated_tasks import RawTasks
+
+def _Partial(rawTasks):
+	# some tasks missing fields and some with unset dates, folders and tags
+	rawTasks[0] = {"id": rawTasks[0]["id"], "title": "Minimal"}
+	rawTasks[1].update(duedate=0, folder=0, tag="")
+	return rawTasks
+
+def test_frame_matches_tasks():
+	pandas = importorskip("pandas")
+	rawTasks = _Partial(RawTasks(300))
+	tasks = _LoadTaskList(rawTasks)
+	frame = _TasksFrame(rawTasks)
+	assert len(frame) == len(tasks)
+	assert str(frame["id_"].dtype) == "int64"
+	assert list(frame["id_"]) == [x.id_ for x in tasks]
+	assert list(frame["title"]) == [x.title for x in tasks]
+	assert frame["status"].dtype == "category"
+	assert list(frame["status"][1:]) == [x.status.name for x in tasks[1:]]
+	assert frame["status"].isna()[0]
+	assert list(frame["tags"][1:]) == [x.tags for x in tasks[1:]]
+	assert frame["dueDate"].isna()[1]
+	assert frame["folderId"].isna()[1]
+	for row, task, rawTask in list(zip(frame.itertuples(), tasks, rawTasks))[2:]:
+		if rawTask["duedate"] == 0:
+			assert task.dueDate is None
+		else:
+			assert row.dueDate.date() == datetime.fromtimestamp(rawTask["duedate"], timezone.utc).date()
+		assert (None if pandas.isna(row.folderId) else row.folderId) == task.folderId
+		assert row.star == task.star
+
+def test_table_matches_frame():
+	importorskip("pyarrow")
+	rawTasks = _Partial(RawTasks(300))
+	table = _TasksTable(rawTasks)
+	assert table.num_rows == len(rawTasks)
+	assert table.column("id_").to_pylist() == [x["id"] for x in rawTasks]
+	assert table.column("tags").to_pylist()[1:] == [x.tags for x in _LoadTaskList(rawTasks)[1:]]
+	assert table.column("priority").to_pylist()[1:] == [x.priority.name for x in _LoadTaskList(rawTasks)[1:]]
+	assert table.column("dueDate").null_count >= 2
+
+def test_get_tasks_frame(fakeServer):
+	importorskip("pandas")
+	fakeServer.SeedTasks(2500)
+	toodledo = FakeToodledo(fakeServer)
+	frame = toodledo.GetTasksFrame(params={"fields": "tag,duedate,status,priority,folder"}, parallel=True)
+	assert len(frame) == 2500
+	assert sorted(frame.columns) == sorted(["id_", "title", "modified", "completedDate", "tags", "dueDate", "status", "priority", "folderId"])
@@ -0,0 +1,47 @@
+from datetime import date
+from io import BytesIO
+from os.path import dirname, join
+
+from toodledo import ImportXml, Priority, Status
+
+def test_import_known_state(toodledo):
+	folders = {x.name: x.id_ for x in toodledo.GetFolders()}
+	contexts = {x.name: x.id_ for x in toodledo.GetContexts()}
+	existingIds = {x.id_ for x in toodledo.GetTasks(params={})}
+
+	added, failures = ImportXml(toodledo, join(dirname(__file__), "known_state.xml"))
+	assert added == 11
+	assert failures == []
+
+	imported = [t for t in toodledo.GetTasks(params={"fields": "folder,context,tag,duedate,star,priority,status"}) if t.id_ not in existingIds]
+	assert len(imported) == 11
+	assert all(t.tags == ["known"] for t in imported)
+	assert all(t.priority == Priority.LOW for t in imported)
+	assert all(t.status == Status.NONE for t in imported)
+	assert [t.folderId for t in imported if t.title == "Test task with private folder"] == [folders["Test Folder - private"]]
+	assert [t.contextId for t in imported if t.title == "Test task with public context"] == [contexts["Test Context - public"]]
+	assert [t.dueDate for t in imported if t.title == "Test task with due date but no due time"] == [date(2018, 12, 21)]
+	assert [t.star for t in imported if t.title == "Test task with star"] == [True]
+
+	toodledo.DeleteTasks(imported)
+
+def test_import_creates_missing_folders(toodledo):
+	export = b"""<xml><item><title>Imported task</title><folder>Imported folder</folder><context></context><completed>0000-00-00</completed></item></xml>"""
+	added, _ = ImportXml(toodledo, BytesIO(export))
+	assert added == 1
+	folder = [x for x in toodledo.GetFolders() if x.name == "Imported folder"][0]
+	task = [t for t in toodledo.GetTasks(params={"fields": "folder"}) if t.title == "Imported task"][0]
+	assert task.folderId == folder.id_
+
+	toodledo.DeleteTasks([task])
+	toodledo.DeleteFolder(folder)
+
+def test_import_unknown_labels(toodledo):
+	export = b"""<xml><item><title>Odd labels</title><priority>Urgent</priority><status>Whenever</status><duedatemodifier>x</duedatemodifier>
+		<length>ten</length><duedate>2019-13-45</duedate></item>
+		<item><title>After the odd one</title><priority>High</priority><length>10</length></item></xml>"""
+	added, failures = ImportXml(toodledo, BytesIO(export))
+	assert (added, failures) == (2, [])
+	imported = {x.title: x for x in toodledo.GetTasks(params={"fields": "priority,length,duedate"})}
+	assert imported["Odd labels"].dueDate is None
+	assert (imported["After the odd one"].priority, imported["After the odd one"].length) == (Priority.HIGH, 10)
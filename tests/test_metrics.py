@@ -0,0 +1,63 @@
+from asyncio import new_event_loop
+
+from pytest import importorskip
+
+from toodledo import ApiMetrics, AsyncToodledo, Task
+
+from .conftest import FakeToodledo
+
+def test_metrics_per_endpoint(fakeServer):
+	fakeServer.SeedTasks(2500)
+	metrics = ApiMetrics()
+	toodledo = FakeToodledo(fakeServer, instrumentation=metrics)
+	tasks = toodledo.GetTasks(params={"fields": "note"}, parallel=True)
+	results = toodledo.AddTasks([Task(title="Metrics {}".format(x)) for x in range(60)])
+	toodledo.DeleteTasks([Task(id_=x.id_) for x in results])
+
+	snapshot = metrics.Snapshot()
+	getTasks = snapshot["getTasksUrl"]
+	assert getTasks["requests"] == 3
+	assert getTasks["decoded"] == {"json": len(tasks), "objects": len(tasks)}
+	assert getTasks["bytesReceived"] > 0
+	assert getTasks["seconds"] > 0
+	assert snapshot["addTasksUrl"]["requests"] == 2
+	assert snapshot["addTasksUrl"]["encoded"] == 60
+	assert snapshot["addTasksUrl"]["bytesSent"] > 60 * len("Metrics 00")
+	assert snapshot["deleteTasksUrl"]["requests"] == 2
+	assert snapshot[None]["tokenRefreshes"] == 0
+
+	samples = {(name, tuple(sorted(labels.items()))): value for name, labels, value in metrics.Samples()}
+	assert samples[("toodledo_requests_total", (("endpoint", "getTasksUrl"),))] == 3
+	assert samples[("toodledo_request_seconds_bucket", (("endpoint", "getTasksUrl"), ("le", "+Inf")))] == 3
+	assert samples[("toodledo_request_seconds_count", (("endpoint", "getTasksUrl"),))] == 3
+	assert samples[("toodledo_decoded_items_total", (("endpoint", "getTasksUrl"), ("stage", "objects")))] == len(tasks)
+
+def test_metrics_count_throttling_and_refreshes(fakeServer):
+	fakeServer.throttleEvery = 3
+	metrics = ApiMetrics()
+	toodledo = FakeToodledo(fakeServer, instrumentation=metrics)
+	for _ in range(3):
+		toodledo.GetAccount()
+	snapshot = metrics.Snapshot()
+	assert snapshot["getAccountUrl"]["throttled"] == 1
+	assert snapshot["getAccountUrl"]["requests"] == 4
+	assert snapshot["getAccountUrl"]["errors"] == 1
+	assert snapshot[None]["tokenRefreshes"] == 1
+
+def test_async_metrics(fakeServer):
+	importorskip("aiohttp")
+	fakeServer.SeedTasks(1500)
+	metrics = ApiMetrics()
+	toodledo = FakeToodledo(fakeServer)
+	async def _Read():
+		async with AsyncToodledo(toodledo.clientId, toodledo.clientSecret, toodledo.tokenStorage, toodledo.scope, baseUrl=fakeServer.baseUrl, instrumentation=metrics) as asyncToodledo:
+			return await asyncToodledo.GetTasks(params={}, parallel=True)
+	loop = new_event_loop()
+	try:
+		tasks = loop.run_until_complete(_Read())
+	finally:
+		loop.close()
+	snapshot = metrics.Snapshot()
+	assert snapshot["getTasksUrl"]["requests"] == 2
+	assert snapshot["getTasksUrl"]["decoded"] == {"objects": len(tasks)}
+	assert snapshot["getTasksUrl"]["bytesReceived"] > 0
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from pytest import raises
+
+from toodledo import Status, TaskQuery
+
+from .conftest import FakeToodledo
+
+def test_query_params():
+	assert TaskQuery().ToParams() == {}
+	assert TaskQuery(fields=["title", "status", "dueDate"]).ToParams() == {"fields": "duedate,status"}
+	after = datetime(2019, 1, 1)
+	assert TaskQuery(completed=False, modifiedAfter=after, id_=5).ToParams() == {"comp": 0, "modafter": int(after.timestamp()), "id": 5}
+	with raises(ValueError):
+		TaskQuery(fields=["titel"])
+
+def test_query_projects_fields(fakeServer):
+	fakeServer.SeedTasks(1200)
+	toodledo = FakeToodledo(fakeServer)
+	tasks = toodledo.GetTasks(TaskQuery(fields=["title", "status"]), parallel=True)
+	assert len(tasks) == 1200
+	for task in tasks:
+		assert isinstance(task.status, Status)
+		assert task.title.startswith("Task")
+		# returned by the API by default but not asked for
+		assert not hasattr(task, "modified")
+		assert not hasattr(task, "completedDate")
+
+	completed = toodledo.GetTasks(TaskQuery(completed=True))
+	uncompleted = toodledo.GetTasks(TaskQuery(completed=False))
+	assert len(completed) + len(uncompleted) == 1200
+	assert len(completed) > 0
+
+	single = toodledo.GetTasks(TaskQuery(fields=["note"], id_=tasks[5].id_))
+	assert [x.id_ for x in single] == [tasks[5].id_]
+	assert hasattr(single[0], "note")
+	assert not hasattr(single[0], "title")
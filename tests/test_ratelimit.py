@@ -0,0 +1,51 @@
+from toodledo import RateLimiter
+
+from .conftest import FakeToodledo
+
+def test_burst_then_wait():
+	limiter = RateLimiter(rate=10.0, burst=2)
+	assert limiter.Reserve() == 0
+	assert limiter.Reserve() == 0
+	delay = limiter.Reserve()
+	assert 0.05 < delay <= 0.1
+	assert limiter.Metrics()["requests"] == 3
+
+def test_aimd():
+	limiter = RateLimiter(rate=4.0, minRate=1.0, maxRate=4.5, increase=1.0, decrease=0.5)
+	limiter.OnThrottle()
+	assert limiter.rate == 2.0
+	assert limiter.Reserve() > 0
+	limiter.OnThrottle()
+	limiter.OnThrottle()
+	assert limiter.rate == 1.0
+	for _ in range(10):
+		limiter.OnSuccess()
+	assert limiter.rate == 4.5
+	assert limiter.Metrics()["throttleEvents"] == 3
+
+def test_shared_between_limiters(tmpdir):
+	path = str(tmpdir.join("limiter"))
+	first = RateLimiter(rate=1.0, burst=1, lockPath=path)
+	second = RateLimiter(rate=1.0, burst=1, lockPath=path)
+	assert first.Reserve() == 0
+	# the second limiter sees the token taken by the first
+	assert second.Reserve() > 0.9
+	first.OnThrottle()
+	second.Reserve()
+	assert second.rate == 0.5
+
+def test_backs_off_when_throttled(fakeServer):
+	fakeServer.SeedTasks(3000)
+	fakeServer.tooManyRequestsEvery = 2
+	limiter = RateLimiter(rate=100.0)
+	toodledo = FakeToodledo(fakeServer, rateLimiter=limiter)
+	assert len(toodledo.GetTasks(params={})) == 3000
+	assert limiter.Metrics()["throttleEvents"] > 0
+
+def test_refreshes_token_on_429(fakeServer):
+	fakeServer.throttleEvery = 3
+	toodledo = FakeToodledo(fakeServer)
+	oldToken = toodledo.tokenStorage.Load()
+	for _ in range(3):
+		_ = toodledo.GetAccount()
+	assert toodledo.tokenStorage.Load()["access_token"] != oldToken["access_token"]
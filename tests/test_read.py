@@ -26,3 +26,19 @@ def test_get_tasks_with_known_contexts(toodledo):
 
 	assert taskWithPrivateContext.contextId == privateContextId
 	assert taskWithPublicContext.contextId == publicContextId
+
+def test_session_is_reused(toodledo):
+	_ = toodledo.GetAccount()
+	session = toodledo._Session() # pylint: disable=protected-access
+	_ = toodledo.GetFolders()
+	assert toodledo._Session() is session # pylint: disable=protected-access
+
+def test_get_tasks_parallel(toodledo):
+	tasks = toodledo.GetTasks(params={})
+	parallelTasks = toodledo.GetTasks(params={}, parallel=True)
+	assert [t.id_ for t in parallelTasks] == [t.id_ for t in tasks]
+
+def test_iter_tasks(toodledo):
+	tasks = toodledo.GetTasks(params={})
+	assert [t.id_ for t in toodledo.IterTasks(params={})] == [t.id_ for t in tasks]
+	assert [t.id_ for t in toodledo.IterTasks(params={}, parallel=True)] == [t.id_ for t in tasks]
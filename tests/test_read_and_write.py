@@ -1,7 +1,11 @@
 from datetime import date
+from json import dumps, loads
 from uuid import uuid4
 
 from toodledo import DueDateModifier, Priority, Status, Task
+from toodledo.batch import _SizedChunks
+
+from .conftest import FakeToodledo
 
 def CreateATask(toodledo, task):
 	task.title = str(uuid4())
@@ -159,3 +163,73 @@ def test_extra_fields(toodledo):
 	tasks = toodledo.GetTasks(params={})
 	ourTasks = [t for t in tasks if t.title == randomTitle]
 	assert len(ourTasks) == 0
+
+def test_bulk_write_results(toodledo):
+	titles = [str(uuid4()) for _ in range(60)]
+	addResults = toodledo.AddTasks([Task(title=title) for title in titles], parallel=True)
+	assert len(addResults) == len(titles)
+	assert all(not x.IsError() for x in addResults)
+	assert [x.task.title for x in addResults] == titles
+
+	ids = [x.id_ for x in addResults]
+	tasks = [t for t in toodledo.GetTasks(params={}) if t.id_ in ids]
+	assert len(tasks) == len(titles)
+
+	for task in tasks:
+		task.star = True
+	editResults = toodledo.EditTasks(tasks, parallel=True)
+	assert sorted(x.id_ for x in editResults) == sorted(ids)
+
+	deleteResults = toodledo.DeleteTasks(tasks, parallel=True)
+	assert sorted(x.id_ for x in deleteResults) == sorted(ids)
+
+def test_edit_sends_only_changes(fakeServer):
+	for x in range(100):
+		fakeServer.AddTask(title="Task {}".format(x), note="A long note\n" * 100, status=0)
+	toodledo = FakeToodledo(fakeServer)
+
+	# the notes are unchanged so only the status goes over the wire
+	tasks = toodledo.GetTasks(params={"fields": "note,status"})
+	for task in tasks[:20]:
+		task.status = Status.HOLD
+	bytesReceived = fakeServer.bytesReceived
+	edits = fakeServer.requestsByPath.get("tasks/edit.php", 0)
+	results = toodledo.EditTasks(tasks)
+	assert len(results) == len(tasks)
+	assert all(not x.IsError() for x in results)
+	assert fakeServer.requestsByPath["tasks/edit.php"] == edits + 1
+	assert fakeServer.bytesReceived - bytesReceived < 2000
+	assert not any(task.IsDirty() for task in tasks)
+
+	tasks = toodledo.GetTasks(params={"fields": "note,status"})
+	assert len([t for t in tasks if t.status == Status.HOLD]) == 20
+	assert all(t.note == "A long note\n" * 100 for t in tasks)
+
+	# nothing changed so nothing is sent
+	toodledo.EditTasks(tasks)
+	assert fakeServer.requestsByPath["tasks/edit.php"] == edits + 1
+
+def test_large_writes_go_in_the_body(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	tasks = [Task(title="Task {}".format(x), note="A long note\n" * 200) for x in range(100)]
+	results = toodledo.AddTasks(tasks)
+	assert all(not x.IsError() for x in results)
+	# still at full batch width
+	assert fakeServer.requestsByPath["tasks/add.php"] == 2
+
+	toodledo.maxPayloadBytes = 20000
+	results = toodledo.AddTasks(tasks)
+	assert all(not x.IsError() for x in results)
+	assert fakeServer.requestsByPath["tasks/add.php"] > 2 + 2
+	assert len(toodledo.GetTasks(params={"fields": "note"})) == 200
+
+def test_sized_chunks():
+	items = list(range(120))
+	chunks, payloads = _SizedChunks(items, [dumps(x) for x in items], 50, 1000)
+	assert [len(x) for x in chunks] == [50, 50, 20]
+	assert [loads(x) for x in payloads] == chunks
+
+	notes = ["x" * 300, "y" * 300, "z" * 2000, "w"]
+	chunks, payloads = _SizedChunks(notes, [dumps(x) for x in notes], 50, 1000)
+	assert chunks == [notes[:2], notes[2:3], notes[3:]]
+	assert all(len(x) <= 1000 for x in payloads if len(loads(x)) > 1)
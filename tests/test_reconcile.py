@@ -0,0 +1,77 @@
+from datetime import date, datetime
+
+from pytest import raises
+
+from toodledo import Priority, Task
+
+from .conftest import FakeToodledo
+
+def _Writes(server):
+	return {path: count for path, count in server.requestsByPath.items() if path in ("tasks/add.php", "tasks/edit.php", "tasks/delete.php")}
+
+def _Ticket(number, **kwargs):
+	return Task(title="Ticket {}".format(number), note="ticket-{}".format(number), **kwargs)
+
+def test_minimal_plan(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	toodledo.AddTasks([_Ticket(x, tags=["b", "a"], priority=Priority.LOW) for x in range(100)] + [Task(title="Not a ticket")])
+	fakeServer.requestsByPath.clear()
+
+	desired = [_Ticket(x, tags=["a", "b"], priority=Priority.LOW) for x in range(1, 101)]
+	desired[0].priority = Priority.HIGH
+	desired[1].dueDate = date(2030, 1, 2)
+	ticketKey = lambda task: task.note if getattr(task, "note", "").startswith("ticket-") else None
+	fields = ["title", "note", "tags", "priority", "dueDate"]
+	plan = toodledo.Reconcile(desired, key=ticketKey, fields=fields, delete=True, dryRun=True)
+	assert (len(plan.adds), len(plan.edits), len(plan.deletes)) == (1, 2, 1)
+	assert _Writes(fakeServer) == {}
+	assert plan.edits[0].DirtyFields() == {"priority"}
+
+	plan = toodledo.Reconcile(desired, key=ticketKey, fields=fields, delete=True)
+	assert len(plan) == 4
+	assert _Writes(fakeServer) == {"tasks/add.php": 1, "tasks/edit.php": 1, "tasks/delete.php": 1}
+	assert not any(x.IsError() for x in plan.addResults + plan.editResults + plan.deleteResults)
+
+	# nothing left to do, and the task without a key was left alone
+	assert len(toodledo.Reconcile(desired, key=ticketKey, fields=fields, delete=True)) == 0
+	titles = [x.title for x in toodledo.GetTasks(params={})]
+	assert "Not a ticket" in titles and "Ticket 0" not in titles and len(titles) == 101
+
+def test_key_by_attribute(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	toodledo.AddTasks([Task(title="First", star=False), Task(title="Second", star=False)])
+	plan = toodledo.Reconcile([Task(title="First", star=True)], key="title")
+	assert (len(plan.adds), len(plan.edits), len(plan.deletes)) == (0, 1, 0)
+	stars = {x.title: x.star for x in toodledo.GetTasks(params={"fields": "star"})}
+	assert stars == {"First": True, "Second": False}
+
+	current = toodledo.GetTasks(params={"fields": "star"})
+	plan = toodledo.Reconcile([Task(title="First", star=True)], key="title", currentTasks=current, delete=True, dryRun=True)
+	assert [x.title for x in plan.deletes] == ["Second"] and len(plan.edits) == 0
+
+	with raises(ValueError):
+		toodledo.Reconcile([Task(title="Same"), Task(title="Same")], key="title")
+	# what a key function reads can't be worked out, so the fields have to be given
+	with raises(ValueError, match="fields"):
+		toodledo.Reconcile([Task(title="First")], key=lambda task: task.title)
+
+def test_read_only_fields_are_not_edited(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	toodledo.AddTasks([Task(title="Stamped")])
+	current = toodledo.GetTasks(params={})
+	desired = [Task(id_=current[0].id_, title="Stamped", modified=datetime(2001, 1, 1))]
+	plan = toodledo.Reconcile(desired, fields=["title", "modified"], dryRun=True)
+	assert len(plan) == 0
+
+def test_default_key_adds_new_tasks(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	existing = toodledo.GetTasks(params={}) + [Task(title="Kept")]
+	toodledo.AddTasks(existing)
+	kept = toodledo.GetTasks(params={})[0]
+	kept.title = "Renamed"
+	plan = toodledo.Reconcile([kept, Task(title="New 1"), Task(title="New 2")])
+	assert (len(plan.adds), len(plan.edits), len(plan.deletes)) == (2, 1, 0)
+	assert sorted(x.title for x in toodledo.GetTasks(params={})) == ["New 1", "New 2", "Renamed"]
+	# tasks missing from the list are only deleted when asked
+	plan = toodledo.Reconcile([kept], delete=True, dryRun=True)
+	assert sorted(x.title for x in plan.deletes) == ["New 1", "New 2"]
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+
+from pytest import raises
+
+from toodledo import Folder, ToodledoError
+from toodledo.singleflight import _ReadKey, _SingleFlight
+
+from .conftest import FakeToodledo
+
+def test_concurrent_reads_share_one_request(fakeServer):
+	fakeServer.SeedTasks(50)
+	folderIds = [fakeServer.AddFolder("First"), fakeServer.AddFolder("Second")]
+	fakeServer.latency = 0.1
+	toodledo = FakeToodledo(fakeServer)
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		results = list(executor.map(lambda _: toodledo.GetTasks(params={"fields": "note"}), range(8)))
+		folders = list(executor.map(lambda _: toodledo.GetFolders(), range(8)))
+	assert fakeServer.requestsByPath["tasks/get.php"] == 1
+	assert fakeServer.requestsByPath["folders/get.php"] == 1
+	assert all(len(x) == 50 for x in results)
+	# each caller gets its own tasks
+	assert results[0][0] is not results[1][0]
+	assert all([x.id_ for x in folder] == folderIds for folder in folders)
+	assert folders[0][0] is not folders[1][0]
+
+def test_read_cache_is_invalidated_by_writes(fakeServer):
+	toodledo = FakeToodledo(fakeServer, readTtl=60)
+	assert toodledo.GetFolders() == []
+	assert toodledo.GetFolders() == []
+	assert fakeServer.requestsByPath["folders/get.php"] == 1
+	toodledo.AddFolder(Folder(name="New", private=False))
+	assert [x.name for x in toodledo.GetFolders()] == ["New"]
+	assert fakeServer.requestsByPath["folders/get.php"] == 2
+	# the order of the params doesn't matter
+	toodledo.GetTasks(params={"comp": 0, "fields": "note"})
+	toodledo.GetTasks(params={"fields": "note", "comp": "0"})
+	assert fakeServer.requestsByPath["tasks/get.php"] == 1
+
+def test_errors_are_not_cached(fakeServer):
+	toodledo = FakeToodledo(fakeServer, readTtl=60)
+	fakeServer.tooManyRequestsEvery = 1
+	for read in [lambda: toodledo.GetDeletedTasks(None), toodledo.GetAccount, toodledo.GetFolders]:
+		with raises(ToodledoError):
+			read()
+	fakeServer.tooManyRequestsEvery = 0
+	assert toodledo.GetDeletedTasks(None) == []
+	assert toodledo.GetAccount() is not None
+	assert toodledo.GetFolders() == []
+
+def test_single_flight():
+	flight = _SingleFlight()
+	started = Event()
+	release = Event()
+	calls = []
+	def _Fetch():
+		calls.append(1)
+		started.set()
+		release.wait()
+		return "value"
+	with ThreadPoolExecutor(max_workers=4) as executor:
+		leader = executor.submit(flight.Do, "key", _Fetch)
+		started.wait()
+		followers = [executor.submit(flight.Do, "key", _Fetch) for _ in range(3)]
+		sleep(0.05)
+		release.set()
+		assert leader.result() == "value"
+		assert [x.result() for x in followers] == ["value"] * 3
+	assert len(calls) == 1
+	# nothing is kept without a ttl
+	flight.Do("key", _Fetch)
+	assert len(calls) == 2
+
+	def _Fail():
+		raise ValueError("failed")
+	with raises(ValueError):
+		flight.Do("other", _Fail)
+	assert _ReadKey("url", {"a": 1, "b": "x"}) == _ReadKey("url", {"b": "x", "a": "1"})
+
+def test_expired_results_are_dropped():
+	flight = _SingleFlight(ttl=0.01)
+	flight.Do("first", lambda: 1)
+	sleep(0.02)
+	flight.Do("second", lambda: 2)
+	assert list(flight.results) == ["second"]
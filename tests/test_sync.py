@@ -0,0 +1,27 @@
+from uuid import uuid4
+
+from toodledo import Task, TaskSync
+
+def test_sync_picks_up_add_and_delete(toodledo):
+	sync = TaskSync(toodledo)
+	edited, deletedIds = sync.Sync()
+	assert len(edited) == len(sync.tasks)
+	assert deletedIds == []
+
+	# nothing changed so nothing is downloaded
+	edited, deletedIds = sync.Sync()
+	assert edited == []
+	assert deletedIds == []
+
+	randomTitle = str(uuid4())
+	toodledo.AddTasks([Task(title=randomTitle)])
+	edited, _ = sync.Sync()
+	ourTasks = [t for t in edited if t.title == randomTitle]
+	assert len(ourTasks) == 1
+	task = ourTasks[0]
+	assert task.id_ in sync.tasks
+
+	toodledo.DeleteTasks([task])
+	_, deletedIds = sync.Sync()
+	assert task.id_ in deletedIds
+	assert task.id_ not in sync.tasks
@@ -0,0 +1,52 @@
+from json import loads
+
+from pytest import raises
+
+from toodledo import Task
+from toodledo.task import _LoadTaskList, _TaskEncoder
+
+from .conftest import SchemaDump, SchemaLoad
+from .generated_tasks import RawTasks
+
+def test_fast_load_matches_schema():
+	rawTasks = RawTasks(500)
+	assert [repr(x) for x in _LoadTaskList(rawTasks)] == [repr(x) for x in SchemaLoad(rawTasks)]
+
+def test_fast_load_partial_tasks():
+	rawTasks = [{"id": 1, "title": "Just the defaults", "modified": 1546300800, "completed": 0}, {"id": 2, "unknown": "ignored"}]
+	fastTasks = _LoadTaskList(rawTasks)
+	assert [repr(x) for x in fastTasks] == [repr(x) for x in SchemaLoad(rawTasks)]
+	assert not hasattr(fastTasks[0], "dueDate")
+	assert fastTasks[0].completedDate is None
+
+def test_unset_attributes():
+	task = Task(title="Partial")
+	assert hasattr(task, "title")
+	assert not hasattr(task, "dueDate")
+	assert repr(task) == "<Task title=Partial>"
+	del task.title
+	assert not hasattr(task, "title")
+	with raises(AttributeError):
+		Task(notAField=1)
+
+def test_dirty_tracking():
+	task = _LoadTaskList(RawTasks(1))[0]
+	assert not task.IsDirty()
+	task.status = task.status
+	task.id_ = 5
+	assert task.DirtyFields() == {"status"}
+	assert "_dirty" not in repr(task)
+	task.MarkClean()
+	assert not task.IsDirty()
+
+	assert Task(id_=1, title="New", star=True).DirtyFields() == {"title", "star"}
+	assert not SchemaLoad(RawTasks(1))[0].IsDirty()
+
+def test_encoder_matches_schema():
+	tasks = _LoadTaskList(RawTasks(500)) + [Task(title="Partial", star=False), Task(id_=3, folderId=None, tags=[])]
+	assert [loads(x) for x in _TaskEncoder()(tasks)] == SchemaDump(tasks)
+
+	task = tasks[0]
+	task.note = "Ünïcode"
+	task.dueDate = None
+	assert loads(_TaskEncoder(dirtyOnly=True)([task])[0]) == {"id": task.id_, "note": "Ünïcode", "duedate": 0} # pylint: disable=no-member
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from pytest import raises
+
+from toodledo import Priority, Status, Task, TaskStore
+
+def _Tasks():
+	today = date(2019, 6, 3)
+	return [
+		Task(id_=1, title="a", folderId=10, status=Status.NEXT_ACTION, priority=Priority.HIGH, star=True, tags=["work"], dueDate=today),
+		Task(id_=2, title="b", folderId=10, status=Status.WAITING, priority=Priority.LOW, star=False, tags=["work", "home"], dueDate=today + timedelta(days=3)),
+		Task(id_=3, title="c", folderId=20, status=Status.NEXT_ACTION, priority=Priority.HIGH, star=False, tags=[], dueDate=today + timedelta(days=10)),
+		Task(id_=4, title="d", folderId=None, status=Status.NONE, priority=Priority.MEDIUM, star=True, tags=["home"], dueDate=None),
+	]
+
+def _Ids(selection):
+	return [task.id_ for task in selection]
+
+def test_queries_compose():
+	store = TaskStore(_Tasks())
+	assert len(store) == 4
+	assert _Ids(store.Select(folderId=10)) == [1, 2]
+	assert _Ids(store.Select(folderId=None)) == [4]
+	assert _Ids(store.Select(tag="home")) == [2, 4]
+	assert _Ids(store.Select(status=Status.NEXT_ACTION).Where(priority=Priority.HIGH, star=True)) == [1]
+	assert _Ids(store.Select().Between("dueDate", date(2019, 6, 1), date(2019, 6, 9))) == [1, 2]
+	assert _Ids(store.Select(folderId=10).Between("dueDate", low=date(2019, 6, 4))) == [2]
+	assert len(store.Select(folderId=30)) == 0
+	assert store.Select().Ids() == [1, 2, 3, 4]
+
+def test_updates_reindex():
+	store = TaskStore(_Tasks())
+	store.Update([Task(id_=1, folderId=20, tags=["home"], dueDate=date(2019, 7, 1))])
+	task = store.Get(1)
+	# attributes that weren't in the update are kept
+	assert task.title == "a"
+	assert task.folderId == 20
+	assert _Ids(store.Select(folderId=10)) == [2]
+	assert _Ids(store.Select(folderId=20)) == [1, 3]
+	assert _Ids(store.Select(tag="work")) == [2]
+	assert _Ids(store.Select().Between("dueDate", high=date(2019, 6, 30))) == [2, 3]
+
+	store.Remove([2, 99])
+	assert 2 not in store
+	assert _Ids(store.Select(tag="home")) == [1, 4]
+	assert _Ids(store.Select().Between("dueDate")) == [1, 3]
+
+def test_selections_are_snapshots():
+	store = TaskStore(_Tasks())
+	selection = store.Select(folderId=10)
+	store.Remove([1])
+	store.Update([Task(id_=5, folderId=10)])
+	assert selection.Ids() == [1, 2]
+	assert _Ids(selection) == [2]
+	assert _Ids(store.Select(folderId=10)) == [2, 5]
+
+def test_between_mixed_bounds():
+	store = TaskStore([Task(id_=1, modified=datetime(2019, 6, 3, 12)), Task(id_=2, modified=datetime(2019, 6, 4, 9), dueDate=date(2019, 6, 4))])
+	assert _Ids(store.Select().Between("modified", date(2019, 6, 3), date(2019, 6, 3))) == [1]
+	assert _Ids(store.Select().Between("modified", low=date(2019, 6, 4))) == [2]
+	assert _Ids(store.Select().Between("dueDate", datetime(2019, 6, 4, 23), datetime(2019, 6, 4, 1))) == [2]
+
+def test_unindexed_names():
+	store = TaskStore([Task(id_=1, title="Only")])
+	with raises(ValueError, match="folderId"):
+		store.Select(title="Only")
+	with raises(ValueError, match="dueDate"):
+		store.Select().Between("completedDate", low=date(2019, 1, 1))
+
+def test_store_follows_client_writes(toodledo):
+	store = TaskStore(toodledo.GetTasks(params={"fields": "folder,tag,status"}))
+	title = str(uuid4())
+	added = toodledo.AddTasks([Task(title=title, tags=["store"], status=Status.ACTIVE)])
+	toodledo.AddTaskListener(store)
+	# only writes made after the store is listening are picked up
+	assert added[0].id_ not in store
+
+	results = toodledo.AddTasks([Task(title=title, tags=["store"], status=Status.ACTIVE)])
+	id_ = results[0].id_
+	assert _Ids(store.Select(tag="store")) == [id_]
+	assert store.Get(id_).title == title
+
+	toodledo.EditTasks([Task(id_=id_, status=Status.HOLD)])
+	assert _Ids(store.Select(tag="store", status=Status.HOLD)) == [id_]
+	assert len(store.Select(tag="store", status=Status.ACTIVE)) == 0
+
+	toodledo.DeleteTasks([store.Get(id_), Task(id_=added[0].id_)])
+	assert id_ not in store
+	assert len(store.Select(tag="store")) == 0
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir
+from time import sleep, time
+
+from toodledo import TokenStorageFile
+
+from .conftest import FakeToodledo
+
+def _ExpireSoon(toodledo, seconds):
+	token = toodledo.tokenStorage.Load()
+	token["expires_at"] = time() + seconds
+	toodledo.tokenStorage.Save(token)
+	return token
+
+def test_refreshes_before_expiry(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	oldToken = _ExpireSoon(toodledo, 30)
+	# all the workers need the refresh at once but only one of them does it. The reads differ so that they aren't shared
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		for _ in executor.map(lambda x: toodledo.GetTasks(params={"modafter": x}), range(16)):
+			pass
+	assert fakeServer.requestsByPath["account/token.php"] == 1
+	assert fakeServer.requestsByPath["tasks/get.php"] == 16
+	assert toodledo.tokenStorage.Load()["access_token"] != oldToken["access_token"]
+
+def test_background_refresh(fakeServer):
+	toodledo = FakeToodledo(fakeServer, backgroundRefresh=True)
+	oldToken = _ExpireSoon(toodledo, 61)
+	toodledo.GetAccount()
+	assert "account/token.php" not in fakeServer.requestsByPath
+	sleep(1.5)
+	assert fakeServer.requestsByPath["account/token.php"] == 1
+	assert toodledo.tokenStorage.Load()["access_token"] != oldToken["access_token"]
+	toodledo.GetAccount()
+	assert fakeServer.requestsByPath["account/token.php"] == 1
+	toodledo.Close()
+
+def test_token_file_save_is_atomic(tmp_path):
+	storage = TokenStorageFile(str(tmp_path / "token.json"))
+	assert storage.Load() is None
+	storage.Save({"access_token": "a"})
+	storage.Save({"access_token": "b"})
+	assert storage.Load() == {"access_token": "b"}
+	assert listdir(str(tmp_path)) == ["token.json"]
+
+def test_token_file_concurrent_saves(tmp_path):
+	storage = TokenStorageFile(str(tmp_path / "token.json"))
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		for _ in executor.map(lambda x: storage.Save({"access_token": str(x)}), range(64)):
+			pass
+	assert int(storage.Load()["access_token"]) in range(64)
+	assert listdir(str(tmp_path)) == ["token.json"]
@@ -0,0 +1,156 @@
+from threading import Thread
+from time import sleep
+
+from toodledo import Status, Task, WriteBehind
+
+from .conftest import FakeToodledo
+
+def _Posts(server):
+	return {path: count for path, count in server.requestsByPath.items() if path.startswith("tasks/") and path != "tasks/get.php"}
+
+def test_edits_are_merged(fakeServer):
+	fakeServer.SeedTasks(3)
+	toodledo = FakeToodledo(fakeServer)
+	tasks = toodledo.GetTasks(params={"fields": "star,status"})
+	queue = WriteBehind(toodledo, interval=None)
+	for star in [True, False, True]:
+		tasks[0].star = star
+		queue.Edit(tasks[0])
+	tasks[0].status = Status.WAITING
+	queue.Edit(tasks[0])
+	tasks[1].title = "Renamed"
+	queue.Edit(tasks[1])
+	assert not tasks[0].IsDirty()
+	assert len(queue) == 2
+	results = queue.Flush()
+	assert len(results) == 2 and not any(x.IsError() for x in results)
+	assert _Posts(fakeServer) == {"tasks/edit.php": 1}
+	edited = {x.id_: x for x in toodledo.GetTasks(params={"fields": "star,status"})}
+	assert edited[tasks[0].id_].star and edited[tasks[0].id_].status == Status.WAITING
+	assert edited[tasks[1].id_].title == "Renamed"
+
+def test_add_then_delete_cancels(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	queue = WriteBehind(toodledo, interval=None)
+	task = Task(title="Short lived")
+	kept = Task(title="Kept")
+	queue.Add(task)
+	queue.Add(kept)
+	kept.note = "Edited before it was added"
+	queue.Edit(kept)
+	queue.Delete(task)
+	assert len(queue) == 1
+	queue.Flush()
+	assert _Posts(fakeServer) == {"tasks/add.php": 1}
+	added = toodledo.GetTasks(params={"fields": "note"})
+	# set by the flush
+	assert [(x.id_, x.note) for x in added] == [(kept.id_, "Edited before it was added")] # pylint: disable=no-member
+
+	kept.title = "Then edited"
+	queue.Edit(kept)
+	queue.Delete(kept)
+	queue.Flush()
+	assert _Posts(fakeServer) == {"tasks/add.php": 1, "tasks/delete.php": 1}
+	assert toodledo.GetTasks(params={}) == []
+
+def test_flush_on_size(fakeServer):
+	fakeServer.SeedTasks(60)
+	toodledo = FakeToodledo(fakeServer)
+	queue = WriteBehind(toodledo, interval=None)
+	for task in toodledo.GetTasks(params={}):
+		task.title = "Batch"
+		queue.Edit(task)
+	assert _Posts(fakeServer) == {"tasks/edit.php": 1}
+	assert len(queue) == 10
+
+def test_flush_on_timer(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	queue = WriteBehind(toodledo, interval=0.05)
+	queue.Add(Task(title="Later"))
+	for _ in range(100):
+		if len(queue) == 0 and fakeServer.requestsByPath.get("tasks/add.php") == 1:
+			break
+		sleep(0.02)
+	assert [x.title for x in toodledo.GetTasks(params={})] == ["Later"]
+	queue.Close()
+
+def test_journal_survives_a_crash(fakeServer, tmpdir):
+	path = str(tmpdir.join("journal"))
+	fakeServer.SeedTasks(2)
+	toodledo = FakeToodledo(fakeServer)
+	tasks = toodledo.GetTasks(params={})
+	queue = WriteBehind(toodledo, interval=None, journalPath=path)
+	queue.Add(Task(title="Queued", tags=["a"]))
+	tasks[0].title = "Queued edit"
+	queue.Edit(tasks[0])
+	queue.Delete(tasks[1])
+	# a partly written record at the end is ignored
+	with open(path, "ab") as f:
+		f.write(b"\xff")
+
+	recovered = WriteBehind(toodledo, interval=None, journalPath=path)
+	assert len(recovered) == 3
+	recovered.Flush()
+	assert sorted(x.title for x in toodledo.GetTasks(params={})) == ["Queued", "Queued edit"]
+	assert len(WriteBehind(toodledo, interval=None, journalPath=path)) == 0
+
+def test_failed_batches_stay_queued(fakeServer):
+	fakeServer.SeedTasks(1)
+	toodledo = FakeToodledo(fakeServer)
+	task = toodledo.GetTasks(params={})[0]
+	queue = WriteBehind(toodledo, interval=None)
+	task.title = "First"
+	queue.Edit(task)
+	toodledo.editTasksUrl = fakeServer.baseUrl + "missing.php"
+	results = queue.Flush()
+	assert results[0].exception is not None
+	task.note = "Second"
+	queue.Edit(task)
+	toodledo.editTasksUrl = fakeServer.baseUrl + "tasks/edit.php"
+	queue.Flush()
+	edited = toodledo.GetTasks(params={"fields": "note"})[0]
+	assert (edited.title, edited.note) == ("First", "Second")
+
+def test_changes_while_adding(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	queue = WriteBehind(toodledo, interval=None)
+	edited = Task(title="Being added")
+	deleted = Task(title="Deleted while being added")
+	queue.Add(edited)
+	queue.Add(deleted)
+	fakeServer.latency = 0.2
+	flush = Thread(target=queue.Flush)
+	flush.start()
+	sleep(0.1)
+	edited.title = "Edited while being added"
+	queue.Edit(edited)
+	queue.Delete(deleted)
+	flush.join()
+	fakeServer.latency = 0
+	assert len(queue) == 2
+	queue.Flush()
+	assert [x.title for x in toodledo.GetTasks(params={})] == ["Edited while being added"]
+
+def test_changes_while_a_rejected_add_is_sent(fakeServer):
+	toodledo = FakeToodledo(fakeServer)
+	queue = WriteBehind(toodledo, interval=None)
+	rejected = Task(title="")
+	kept = Task(title="Kept")
+	queue.Add(rejected)
+	queue.Add(kept)
+	fakeServer.latency = 0.2
+	results = []
+	flush = Thread(target=lambda: results.extend(queue.Flush()))
+	flush.start()
+	sleep(0.1)
+	rejected.title = "Too late"
+	queue.Edit(rejected)
+	kept.title = "Kept and edited"
+	queue.Edit(kept)
+	flush.join()
+	fakeServer.latency = 0
+	assert [x.errorCode for x in results] == [601, None, 601]
+	assert not hasattr(rejected, "id_")
+	assert len(queue) == 1
+	queue.Flush()
+	assert [x.title for x in toodledo.GetTasks(params={})] == ["Kept and edited"]
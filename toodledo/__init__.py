@@ -1,9 +1,21 @@
 """Python wrapper for the Toodledo v3 API which is documented at http://api.toodledo.com/3/"""
 
+from .accounts import AccountSync, AccountSyncResult
+from .asynchronous import AsyncToodledo
 from .authorization import CommandLineAuthorization
+from .batch import TaskWriteResult
+from .cache import CachedState, TaskCacheFile, TaskCacheSqlite
 from .context import Context
 from .folder import Folder
+from .importer import ImportXml
+from .metrics import ApiMetrics, Instrumentation
+from .query import TaskQuery
+from .ratelimit import RateLimiter
+from .reconcile import ReconcilePlan
 from .storage import TokenStorageFile
+from .sync import TaskSync
 from .task import Task
+from .taskstore import TaskStore
 from .transport import AuthorizationNeeded, Toodledo, ToodledoError
 from .types import DueDateModifier, Priority, Status
+from .writebehind import WriteBehind
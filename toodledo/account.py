@@ -4,17 +4,21 @@ from marshmallow import post_load, Schema
 from .custom_fields import _ToodledoDatetime
 
 class _Account: # pylint: disable=too-few-public-methods
-	def __init__(self, lastEditTask, lastDeleteTask):
+	def __init__(self, lastEditTask, lastDeleteTask, lastEditFolder=None, lastEditContext=None):
 		self.lastEditTask = lastEditTask
 		self.lastDeleteTask = lastDeleteTask
+		self.lastEditFolder = lastEditFolder
+		self.lastEditContext = lastEditContext
 
 	def __repr__(self):
-		return "<_Account lastEditTask={}, lastDeleteTask={}>".format(self.lastEditTask, self.lastDeleteTask)
+		return "<_Account lastEditTask={}, lastDeleteTask={}, lastEditFolder={}, lastEditContext={}>".format(self.lastEditTask, self.lastDeleteTask, self.lastEditFolder, self.lastEditContext)
 
 class _AccountSchema(Schema):
 	lastEditTask = _ToodledoDatetime(dump_to="lastedit_task", load_from="lastedit_task")
 	lastDeleteTask = _ToodledoDatetime(dump_to="lastdelete_task", load_from="lastdelete_task")
+	lastEditFolder = _ToodledoDatetime(dump_to="lastedit_folder", load_from="lastedit_folder")
+	lastEditContext = _ToodledoDatetime(dump_to="lastedit_context", load_from="lastedit_context")
 
 	@post_load
 	def _MakeAccount(self, data): # pylint: disable=no-self-use
-		return _Account(data["lastEditTask"], data["lastDeleteTask"])
+		return _Account(data["lastEditTask"], data["lastDeleteTask"], data.get("lastEditFolder"), data.get("lastEditContext"))
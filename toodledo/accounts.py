@@ -0,0 +1,142 @@
+"""Reads for many accounts at once"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition
+
+from .ratelimit import RateLimiter, _RateLimiters
+from .transport import Toodledo, _Adapter
+
+class AccountSyncResult: # pylint: disable=too-few-public-methods
+	"""What one account's reads returned. The reads that weren't asked for are None, as are the ones that failed,
+	whose exceptions are in errors by the name of the read"""
+	def __init__(self):
+		self.account = None
+		self.tasks = None
+		self.folders = None
+		self.contexts = None
+		self.errors = {}
+
+	def __repr__(self):
+		return "<AccountSyncResult tasks={}, folders={}, contexts={}, errors={}>".format(
+			None if self.tasks is None else len(self.tasks),
+			None if self.folders is None else len(self.folders),
+			None if self.contexts is None else len(self.contexts),
+			self.errors)
+
+class _FairQueue:
+	"""Jobs queued per account and handed out round-robin, with at most maxPerAccount of any account's jobs running at once,
+	so that an account with a lot to do can't hold up the others"""
+
+	def __init__(self, jobsByAccount, maxPerAccount):
+		self.pending = {key: deque(jobs) for key, jobs in jobsByAccount.items() if len(jobs) > 0}
+		self.order = deque(self.pending)
+		self.running = {key: 0 for key in self.pending}
+		self.maxPerAccount = maxPerAccount
+		self.remaining = sum(len(x) for x in self.pending.values())
+		self.condition = Condition()
+
+	def Take(self):
+		"""Block until a job can run and return (account key, job), or None once every job has been taken"""
+		with self.condition:
+			while self.remaining > 0:
+				for _ in range(len(self.order)):
+					key = self.order[0]
+					self.order.rotate(-1)
+					if self.running[key] < self.maxPerAccount:
+						job = self.pending[key].popleft()
+						if len(self.pending[key]) == 0:
+							self.order.remove(key)
+						self.running[key] += 1
+						self.remaining -= 1
+						return key, job
+				self.condition.wait()
+			return None
+
+	def Done(self, key):
+		"""A job taken for the account has finished"""
+		with self.condition:
+			self.running[key] -= 1
+			self.condition.notify_all()
+
+class AccountSync:
+	"""Runs the same reads for many accounts on one bounded pool of worker threads. All the accounts share one HTTP connection pool
+	and an optional global RateLimiter, and each account can also have its own rate limit. Each account backs off on its own when it is throttled. The accounts take turns, so the time
+	taken grows with the total number of requests divided by maxWorkers rather than with the number of accounts"""
+
+	# the reads that Sync can do, by name
+	reads = ("account", "tasks", "folders", "contexts")
+
+	def __init__(self, clientId, clientSecret, tokenStorages, scope, maxWorkers=8, maxPerAccount=1, rateLimiter=None, accountRate=None, maxRetries=3, **kwargs): # pylint: disable=too-many-arguments
+		"""tokenStorages maps a key for each account, such as a user id, to its token storage.
+		maxWorkers bounds the number of requests in flight across all the accounts and maxPerAccount bounds it for each account.
+		rateLimiter is an optional RateLimiter shared by all the accounts and accountRate an optional limit in requests per second for each account.
+		The other arguments are passed to each Toodledo object"""
+		self.maxWorkers = maxWorkers
+		self.maxPerAccount = maxPerAccount
+		# passed to each Toodledo object as an adapter, which their Close leaves open
+		self.adapter = _Adapter(1, maxWorkers, maxRetries)
+		self.accounts = {}
+		for key, tokenStorage in tokenStorages.items():
+			self.accounts[key] = Toodledo(clientId, clientSecret, tokenStorage, scope, maxRetries=maxRetries,
+				rateLimiter=AccountSync._AccountLimiter(rateLimiter, accountRate), adapter=self.adapter, **kwargs)
+
+	@staticmethod
+	def _AccountLimiter(rateLimiter, accountRate):
+		# Each account backs off on its own when it's throttled, so that one busy account doesn't slow down the others, and the shared
+		# limiter only caps the total. Without an accountRate, the account's own limiter starts with the same settings as the shared one
+		if rateLimiter is None and accountRate is None:
+			return None
+		if accountRate is not None:
+			own = RateLimiter(rate=accountRate, burst=1, minRate=min(accountRate, 0.1), maxRate=accountRate)
+		else:
+			own = RateLimiter(rate=rateLimiter.rate, burst=rateLimiter.burst, minRate=rateLimiter.minRate, maxRate=rateLimiter.maxRate,
+				increase=rateLimiter.increase, decrease=rateLimiter.decrease)
+		return _RateLimiters([own] + ([rateLimiter] if rateLimiter is not None else []), adaptive=[own])
+
+	def Close(self):
+		"""Close the pooled connections"""
+		for toodledo in self.accounts.values():
+			toodledo.Close()
+		self.adapter.close()
+
+	@staticmethod
+	def _Read(toodledo, read, params, result):
+		if read == "account":
+			result.account = toodledo.GetAccount()
+		elif read == "tasks":
+			result.tasks = toodledo.GetTasks(params)
+		elif read == "folders":
+			result.folders = toodledo.GetFolders()
+		else:
+			result.contexts = toodledo.GetContexts()
+
+	def Sync(self, reads=("account", "tasks", "folders", "contexts"), params=None, keys=None):
+		"""Do the given reads for every account, or for the ones in keys, and return {key: AccountSyncResult}.
+		params is the params dictionary or TaskQuery for GetTasks. A failing read doesn't stop the others"""
+		unknown = set(reads) - set(AccountSync.reads)
+		if len(unknown) > 0:
+			raise ValueError("Unknown reads: {}".format(", ".join(sorted(unknown))))
+		params = params if params is not None else {}
+		keys = list(keys) if keys is not None else list(self.accounts)
+		results = {key: AccountSyncResult() for key in keys}
+		queue = _FairQueue({key: list(reads) for key in keys}, self.maxPerAccount)
+
+		def _Work():
+			while True:
+				taken = queue.Take()
+				if taken is None:
+					return
+				key, read = taken
+				try:
+					AccountSync._Read(self.accounts[key], read, params, results[key])
+				except Exception as e: # pylint: disable=broad-except
+					results[key].errors[read] = e
+				finally:
+					queue.Done(key)
+
+		workers = max(1, min(self.maxWorkers, len(keys) * len(reads)))
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			for future in [executor.submit(_Work) for _ in range(workers)]:
+				future.result()
+		return results
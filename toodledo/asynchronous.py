@@ -0,0 +1,343 @@
+"""asyncio version of the Toodledo class, built on aiohttp"""
+
+from asyncio import gather, get_event_loop, Lock, Semaphore, sleep
+from functools import partial
+from json import dumps
+from logging import debug, error, warning
+from time import perf_counter, time
+from urllib.parse import urlencode
+
+from .account import _AccountSchema
+from .batch import _AddResult, _CollectResults, _DeleteResult, _DirtyTasks, _EditResult, _NotifyChanged, _NotifyDeleted, _NotifyEdited, _SizedChunks, _WithSkipped
+from .context import _ContextSchema
+from .errors import ToodledoError
+from .folder import _FolderSchema
+from .frame import _TasksFrame, _TasksTable
+from .metrics import Instrumentation
+from .query import TaskQuery, _ParamsAndKeys
+from .reconcile import _Fields, _Plan
+from .task import _LoadTaskList, _TaskEncoder, _TaskSchema
+from .transport import _Endpoints, AuthorizationNeeded, Toodledo
+
+def _RaiseForErrorCode(jsonResponse):
+	if isinstance(jsonResponse, dict) and "errorCode" in jsonResponse:
+		error("Toodledo error: {}".format(jsonResponse))
+		raise ToodledoError(jsonResponse["errorCode"])
+
+async def _RunBlocking(function, *args):
+	# token storage and shared rate limiters read and lock files, which mustn't hold up the event loop
+	return await get_event_loop().run_in_executor(None, partial(function, *args))
+
+class AsyncToodledo: # pylint: disable=too-many-instance-attributes,too-many-public-methods
+	"""Wrapper for the Toodledo v3 API for use with asyncio. Requires aiohttp.
+	The methods are coroutines with the same arguments and results as the ones on Toodledo"""
+
+	# the same endpoints as Toodledo, replaced on the instance when a baseUrl is given
+	baseUrl = Toodledo.baseUrl
+	tokenUrl = Toodledo.tokenUrl
+	getAccountUrl = Toodledo.getAccountUrl
+	getTasksUrl = Toodledo.getTasksUrl
+	deleteTasksUrl = Toodledo.deleteTasksUrl
+	deletedTasksUrl = Toodledo.deletedTasksUrl
+	addTasksUrl = Toodledo.addTasksUrl
+	editTasksUrl = Toodledo.editTasksUrl
+	getFoldersUrl = Toodledo.getFoldersUrl
+	addFolderUrl = Toodledo.addFolderUrl
+	deleteFolderUrl = Toodledo.deleteFolderUrl
+	editFolderUrl = Toodledo.editFolderUrl
+	getContextsUrl = Toodledo.getContextsUrl
+	addContextUrl = Toodledo.addContextUrl
+	editContextUrl = Toodledo.editContextUrl
+	deleteContextUrl = Toodledo.deleteContextUrl
+
+	# refresh the token this many seconds before it expires
+	refreshMargin = 60
+	# see Toodledo.maxPayloadBytes
+	maxPayloadBytes = 1000000
+
+	def __init__(self, clientId, clientSecret, tokenStorage, scope, session=None, maxWorkers=4, rateLimiter=None, baseUrl=None, instrumentation=None): # pylint: disable=too-many-arguments
+		"""session is an optional aiohttp.ClientSession that can be shared with other clients - it isn't closed by Close.
+		maxWorkers bounds the number of concurrent requests made by the parallel variants of the calls.
+		rateLimiter is an optional RateLimiter, which can be shared with other clients.
+		baseUrl points all the calls at another server, such as a local stand-in for testing.
+		instrumentation is an optional Instrumentation, such as ApiMetrics, which is told about every request"""
+		self.tokenStorage = tokenStorage
+		self.clientId = clientId
+		self.clientSecret = clientSecret
+		self.scope = scope
+		self.maxWorkers = maxWorkers
+		self.rateLimiter = rateLimiter
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+		endpoints = _Endpoints(baseUrl if baseUrl is not None else Toodledo.baseUrl)
+		if baseUrl is not None:
+			for name, url in endpoints.items():
+				setattr(self, name, url)
+		self.endpointNames = {url: name for name, url in endpoints.items()}
+		self._session = session
+		self._ownsSession = session is None
+		self._token = None
+		self._tokenLock = Lock()
+		self.taskListeners = []
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *args):
+		await self.Close()
+
+	def _Session(self):
+		if self._session is None:
+			from aiohttp import ClientSession # pylint: disable=import-outside-toplevel
+			self._session = ClientSession()
+		return self._session
+
+	async def Close(self):
+		"""Close the session if it was created by this object"""
+		if self._session is not None and self._ownsSession:
+			await self._session.close()
+			self._session = None
+
+	async def _Token(self):
+		# concurrent callers wait for the same load or refresh rather than each doing their own
+		async with self._tokenLock:
+			if self._token is None:
+				self._token = await _RunBlocking(self.tokenStorage.Load)
+				if self._token is None:
+					raise AuthorizationNeeded("No token in storage")
+			if "expires_at" in self._token and self._token["expires_at"] - AsyncToodledo.refreshMargin < time():
+				await self._RefreshToken()
+			return self._token
+
+	async def _RefreshToken(self):
+		from aiohttp import BasicAuth # pylint: disable=import-outside-toplevel
+		debug("Refreshing token")
+		data = {"grant_type": "refresh_token", "refresh_token": self._token["refresh_token"]}
+		start = perf_counter()
+		async with self._Session().post(self.tokenUrl, data=data, auth=BasicAuth(self.clientId, self.clientSecret)) as response:
+			response.raise_for_status()
+			refreshed = await response.json(content_type=None)
+		self.instrumentation.OnTokenRefresh(perf_counter() - start)
+		_RaiseForErrorCode(refreshed)
+		token = dict(self._token)
+		token.update(refreshed)
+		if "expires_in" in refreshed:
+			token["expires_at"] = time() + float(refreshed["expires_in"])
+		self._token = token
+		await _RunBlocking(self.tokenStorage.Save, token)
+
+	# the retry loop keeps the throttling state, token and timing of each attempt in locals
+	async def _Request(self, method, url, params=None, data=None): # pylint: disable=too-many-locals
+		refreshed = False
+		retries = 5 if self.rateLimiter is not None else 1
+		endpoint = self.endpointNames.get(url, url)
+		bytesSent = len(url) + len(urlencode(params or {})) + len(urlencode(data or {}))
+		jsonResponse = None
+		for attempt in range(retries + 1):
+			token = await self._Token()
+			if self.rateLimiter is not None:
+				await sleep(await _RunBlocking(self.rateLimiter.Reserve))
+			headers = {"Authorization": "Bearer " + token["access_token"]}
+			start = perf_counter()
+			async with self._Session().request(method, url, params=params, data=data, headers=headers) as response:
+				body = await response.read()
+				self.instrumentation.OnRequest(endpoint, method, response.status, perf_counter() - start, bytesSent, len(body), 0)
+				if response.status == 429:
+					self.instrumentation.OnThrottled(endpoint, 429)
+					if attempt == retries:
+						response.raise_for_status()
+				else:
+					response.raise_for_status()
+					jsonResponse = await response.json(content_type=None)
+			if response.status == 429:
+				if not refreshed:
+					warning("Received 429 error - refreshing token and retrying")
+					async with self._tokenLock:
+						# another request may have refreshed it while we waited for the lock
+						if self._token["access_token"] == token["access_token"]:
+							await self._RefreshToken()
+					refreshed = True
+			elif self.rateLimiter is None:
+				return jsonResponse
+			elif not (isinstance(jsonResponse, dict) and jsonResponse.get("errorCode") == 3):
+				await _RunBlocking(self.rateLimiter.OnSuccess)
+				return jsonResponse
+			else:
+				self.instrumentation.OnThrottled(endpoint, response.status)
+				warning("Too many API requests - backing off, attempt {}".format(attempt + 1))
+			if self.rateLimiter is not None:
+				await _RunBlocking(self.rateLimiter.OnThrottle)
+		# still throttled with error code 3 after the last attempt, which the caller raises
+		return jsonResponse
+
+	async def _Gather(self, coroutines, parallel):
+		# run the coroutines in order or concurrently, bounded by maxWorkers
+		if not parallel:
+			# a loop rather than a comprehension since await in comprehensions needs Python 3.6
+			results = []
+			for coroutine in coroutines:
+				results.append(await coroutine)
+			return results
+		semaphore = Semaphore(self.maxWorkers)
+		async def _Bounded(coroutine):
+			async with semaphore:
+				return await coroutine
+		return await gather(*[_Bounded(coroutine) for coroutine in coroutines])
+
+	async def GetFolders(self):
+		"""Get all the folders as folder objects"""
+		folders = await self._Request("GET", self.getFoldersUrl)
+		_RaiseForErrorCode(folders)
+		schema = _FolderSchema()
+		return [schema.load(x).data for x in folders]
+
+	async def AddFolder(self, folder):
+		"""Add folder, return the created folder"""
+		response = await self._Request("POST", self.addFolderUrl, data={"name": folder.name, "private": 1 if folder.private else 0})
+		_RaiseForErrorCode(response)
+		return _FolderSchema().load(response[0]).data
+
+	async def DeleteFolder(self, folder):
+		"""Delete folder"""
+		response = await self._Request("POST", self.deleteFolderUrl, data={"id": folder.id_})
+		_RaiseForErrorCode(response)
+		assert response == {"deleted": folder.id_}, dumps(response)
+
+	async def EditFolder(self, folder):
+		"""Edits the given folder to have the given properties"""
+		response = await self._Request("POST", self.editFolderUrl, data=_FolderSchema().dump(folder).data)
+		_RaiseForErrorCode(response)
+		return _FolderSchema().load(response[0]).data
+
+	async def GetContexts(self):
+		"""Get all the contexts as context objects"""
+		contexts = await self._Request("GET", self.getContextsUrl)
+		_RaiseForErrorCode(contexts)
+		schema = _ContextSchema()
+		return [schema.load(x).data for x in contexts]
+
+	async def AddContext(self, context):
+		"""Add context, return the created context"""
+		response = await self._Request("POST", self.addContextUrl, data={"name": context.name, "private": 1 if context.private else 0})
+		_RaiseForErrorCode(response)
+		return _ContextSchema().load(response[0]).data
+
+	async def DeleteContext(self, context):
+		"""Delete context"""
+		response = await self._Request("POST", self.deleteContextUrl, data={"id": context.id_})
+		_RaiseForErrorCode(response)
+		assert response == {"deleted": context.id_}, dumps(response)
+
+	async def EditContext(self, context):
+		"""Edits the given context to have the given properties"""
+		response = await self._Request("POST", self.editContextUrl, data=_ContextSchema().dump(context).data)
+		_RaiseForErrorCode(response)
+		return _ContextSchema().load(response[0]).data
+
+	async def GetAccount(self):
+		"""Get the Toodledo account"""
+		accountInfo = await self._Request("GET", self.getAccountUrl)
+		_RaiseForErrorCode(accountInfo)
+		return _AccountSchema().load(accountInfo).data
+
+	async def _GetTasksPage(self, params, start, limit):
+		debug("Start: {}".format(start))
+		tasks = await self._Request("GET", self.getTasksUrl, dict(params, start=start, num=limit))
+		_RaiseForErrorCode(tasks)
+		# the first element contains the number of tasks returned and the total number matching the params
+		return tasks[0], tasks[1:]
+
+	async def _GetRawTasks(self, params, parallel):
+		limit = 1000 # single request limit
+		summary, allTasks = await self._GetTasksPage(params, 0, limit)
+		if parallel:
+			pages = await self._Gather([self._GetTasksPage(params, start, limit) for start in range(limit, summary["total"], limit)], True)
+			for _, tasks in pages:
+				allTasks.extend(tasks)
+		else:
+			tasks = allTasks
+			start = 0
+			while len(tasks) == limit:
+				start += limit
+				_, tasks = await self._GetTasksPage(params, start, limit)
+				allTasks.extend(tasks)
+		return allTasks
+
+	def _Decode(self, decode, rawTasks, keys, stage):
+		start = perf_counter()
+		decoded = decode(rawTasks, keys)
+		self.instrumentation.OnDecode("getTasksUrl", stage, perf_counter() - start, len(rawTasks))
+		return decoded
+
+	async def GetTasks(self, params, parallel=False):
+		"""Get the tasks filtered by the given params, which is either a dictionary of the API's parameters or a TaskQuery.
+		With parallel=True, the total from the first page is used to fetch the remaining pages concurrently"""
+		params, keys = _ParamsAndKeys(params)
+		return self._Decode(_LoadTaskList, await self._GetRawTasks(params, parallel), keys, "objects")
+
+	async def GetTasksFrame(self, params, parallel=False):
+		"""See Toodledo.GetTasksFrame"""
+		params, keys = _ParamsAndKeys(params)
+		return self._Decode(_TasksFrame, await self._GetRawTasks(params, parallel), keys, "frame")
+
+	async def GetTasksTable(self, params, parallel=False):
+		"""See Toodledo.GetTasksTable"""
+		params, keys = _ParamsAndKeys(params)
+		return self._Decode(_TasksTable, await self._GetRawTasks(params, parallel), keys, "frame")
+
+	async def GetDeletedTasks(self, after):
+		"""Get the ids of the tasks deleted after the given datetime, or all the deleted tasks if after is None"""
+		deleted = await self._Request("GET", self.deletedTasksUrl, {"after": int(after.timestamp()) if after is not None else 0})
+		_RaiseForErrorCode(deleted)
+		# the first element contains the count
+		return [int(x["id"]) for x in deleted[1:]]
+
+	def AddTaskListener(self, listener):
+		"""See Toodledo.AddTaskListener"""
+		self.taskListeners.append(listener)
+
+	async def _PostTasks(self, url, payload):
+		try:
+			taskResponse = await self._Request("POST", url, data={"tasks": payload})
+			_RaiseForErrorCode(taskResponse)
+			return taskResponse, None
+		except Exception as e: # pylint: disable=broad-except
+			return None, e
+
+	async def _WriteTasks(self, url, taskList, encode, makeResult, parallel, raiseOnError, notify): # pylint: disable=too-many-arguments
+		limit = 50 # single request limit
+		endpoint = self.endpointNames.get(url, url)
+		start = perf_counter()
+		chunks, payloads = _SizedChunks(taskList, encode(taskList), limit, self.maxPayloadBytes)
+		self.instrumentation.OnEncode(endpoint, perf_counter() - start, len(taskList))
+		outcomes = await self._Gather([self._PostTasks(url, payload) for payload in payloads], parallel)
+		start = perf_counter()
+		try:
+			return _CollectResults(chunks, outcomes, makeResult, raiseOnError, partial(notify, self.taskListeners))
+		finally:
+			self.instrumentation.OnDecode(endpoint, "objects", perf_counter() - start, len(taskList))
+
+	async def EditTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Save the changes to the given tasks. See Toodledo.EditTasks for the details and Toodledo.AddTasks for the arguments and the result"""
+		isDirty, dirtyTasks = _DirtyTasks(taskList)
+		results = await self._WriteTasks(self.editTasksUrl, dirtyTasks, _TaskEncoder(dirtyOnly=True), partial(_EditResult, _TaskSchema()), parallel, raiseOnError, _NotifyEdited)
+		return _WithSkipped(taskList, isDirty, results)
+
+	async def AddTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Add the given tasks. See Toodledo.AddTasks for the arguments and the result"""
+		return await self._WriteTasks(self.addTasksUrl, taskList, _TaskEncoder(), partial(_AddResult, _TaskSchema()), parallel, raiseOnError, _NotifyChanged)
+
+	async def DeleteTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Delete the given tasks. See Toodledo.AddTasks for the arguments and the result"""
+		return await self._WriteTasks(self.deleteTasksUrl, taskList, lambda chunk: [str(task.id_) for task in chunk], _DeleteResult, parallel, raiseOnError, _NotifyDeleted)
+
+	async def Reconcile(self, desiredTasks, key="id_", fields=None, currentTasks=None, delete=False, dryRun=False, parallel=False, raiseOnError=True): # pylint: disable=too-many-arguments
+		"""Make the remote tasks match desiredTasks. See Toodledo.Reconcile for the details"""
+		fields = _Fields(desiredTasks, key, fields)
+		if currentTasks is None:
+			currentTasks = await self.GetTasks(TaskQuery(fields=fields), parallel=parallel)
+		plan = _Plan(desiredTasks, currentTasks, key, fields, delete)
+		if not dryRun:
+			plan.addResults = await self.AddTasks(plan.adds, parallel, raiseOnError)
+			plan.editResults = await self.EditTasks(plan.edits, parallel, raiseOnError)
+			plan.deleteResults = await self.DeleteTasks(plan.deletes, parallel, raiseOnError)
+		return plan
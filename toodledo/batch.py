@@ -0,0 +1,123 @@
+"""Batched task writes"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import ToodledoError
+from .task import _MergedTask
+
+class TaskWriteResult:
+	"""The outcome of adding, editing or deleting a single task"""
+	def __init__(self, id_=None, errorCode=None, task=None, exception=None):
+		"""task is built from the fields returned by the API, exception is set when the whole batch containing the task failed"""
+		self.id_ = id_
+		self.errorCode = errorCode
+		self.task = task
+		self.exception = exception
+
+	def __repr__(self):
+		return "<TaskWriteResult id_={}, errorCode={}, task={}, exception={!r}>".format(self.id_, self.errorCode, self.task, self.exception)
+
+	def IsError(self):
+		"""Indicate whether the write failed for this task"""
+		return self.errorCode is not None or self.exception is not None
+
+def _AddResult(schema, _, entry):
+	if "errorCode" in entry:
+		return TaskWriteResult(errorCode=entry["errorCode"])
+	return TaskWriteResult(id_=entry["id"], task=schema.load(entry).data)
+
+def _EditResult(schema, task, entry):
+	if "errorCode" in entry:
+		return TaskWriteResult(id_=entry.get("id", task.id_), errorCode=entry["errorCode"])
+	return TaskWriteResult(id_=entry["id"], task=schema.load(entry).data)
+
+def _DeleteResult(task, entry):
+	if isinstance(entry, dict) and "errorCode" in entry:
+		return TaskWriteResult(id_=entry.get("id", task.id_), errorCode=entry["errorCode"])
+	return TaskWriteResult(id_=entry)
+
+def _SizedChunks(items, texts, limit, maxBytes):
+	"""Split the items into batches of at most limit items whose JSON payload is at most maxBytes - an item that is bigger on its own goes alone.
+	texts has the JSON text of each item. Returns the batches and their payloads"""
+	chunks = []
+	payloads = []
+	start = 0
+	size = 2
+	for index, text in enumerate(texts):
+		# some JSON libraries write non-ASCII characters as they are rather than escaping them
+		length = len(text.encode("utf-8")) + 1
+		if index > start and (index - start == limit or size + length > maxBytes):
+			chunks.append(items[start:index])
+			payloads.append("[" + ",".join(texts[start:index]) + "]")
+			start = index
+			size = 2
+		size += length
+	if start < len(items):
+		chunks.append(items[start:])
+		payloads.append("[" + ",".join(texts[start:]) + "]")
+	return chunks, payloads
+
+def _RunBatches(chunks, send, maxWorkers):
+	"""Call send on each chunk, with up to maxWorkers running at once, and return a list of (response, exception) in the same order as the chunks.
+	A failing chunk doesn't stop the others"""
+	def _Send(chunk):
+		try:
+			return send(chunk), None
+		except Exception as e: # pylint: disable=broad-except
+			return None, e
+
+	if maxWorkers <= 1 or len(chunks) <= 1:
+		return [_Send(chunk) for chunk in chunks]
+	with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+		return list(executor.map(_Send, chunks))
+
+def _CollectResults(chunks, outcomes, makeResult, raiseOnError, notify=None): # pylint: disable=too-many-arguments
+	"""Turn the per-chunk outcomes into one TaskWriteResult per input item.
+	notify is called with the items and their results before any error is raised, since the other batches still went through"""
+	results = []
+	firstException = None
+	for chunk, (response, exception) in zip(chunks, outcomes):
+		if exception is not None:
+			firstException = firstException or exception
+			errorCode = exception.errorCode if isinstance(exception, ToodledoError) else None
+			results.extend(TaskWriteResult(id_=getattr(item, "id_", None), errorCode=errorCode, exception=exception) for item in chunk)
+		else:
+			# the API returns one entry per task in the same order as the request
+			results.extend(makeResult(item, entry) for item, entry in zip(chunk, response))
+	if notify is not None:
+		notify([item for chunk in chunks for item in chunk], results)
+	if raiseOnError and firstException is not None:
+		raise firstException
+	return results
+
+def _NotifyChanged(listeners, taskList, results):
+	"""Tell the listeners about the tasks that were added or edited, combining the fields that were sent with the ones returned"""
+	if len(listeners) == 0:
+		return
+	changed = [_MergedTask(task, result.task) for task, result in zip(taskList, results) if not result.IsError()]
+	for listener in listeners:
+		listener.OnTasksChanged(changed)
+
+def _NotifyEdited(listeners, taskList, results):
+	"""Mark the successfully edited tasks clean, then tell the listeners"""
+	for task, result in zip(taskList, results):
+		if not result.IsError():
+			task.MarkClean()
+	_NotifyChanged(listeners, taskList, results)
+
+def _DirtyTasks(taskList):
+	"""Which of the tasks have changes, and the list of those"""
+	isDirty = [task.IsDirty() for task in taskList]
+	return isDirty, [task for task, dirty in zip(taskList, isDirty) if dirty]
+
+def _WithSkipped(taskList, isDirty, results):
+	"""Results for all the tasks from the results for the dirty ones. The skipped clean tasks get a successful result with just their id"""
+	results = iter(results)
+	return [next(results) if dirty else TaskWriteResult(id_=task.id_) for task, dirty in zip(taskList, isDirty)]
+
+def _NotifyDeleted(listeners, _, results):
+	if len(listeners) == 0:
+		return
+	deleted = [result.id_ for result in results if not result.IsError()]
+	for listener in listeners:
+		listener.OnTasksDeleted(deleted)
@@ -0,0 +1,205 @@
+"""Persistent task, folder and context caches"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from pickle import dumps, loads, UnpicklingError
+from sqlite3 import connect
+
+from .context import Context
+from .folder import Folder
+from .storage import _ReplaceFile
+from .task import Task
+from .types import DueDateModifier, Priority, Status
+
+class CachedState: # pylint: disable=too-few-public-methods
+	"""Everything that a cache stores - the tasks, folders and contexts and the account timestamps they are current as of"""
+	def __init__(self, tasks=None, folders=None, contexts=None, lastEditTask=None, lastDeleteTask=None, lastEditFolder=None, lastEditContext=None): # pylint: disable=too-many-arguments
+		self.tasks = tasks if tasks is not None else []
+		self.folders = folders if folders is not None else []
+		self.contexts = contexts if contexts is not None else []
+		self.lastEditTask = lastEditTask
+		self.lastDeleteTask = lastDeleteTask
+		self.lastEditFolder = lastEditFolder
+		self.lastEditContext = lastEditContext
+
+	def __repr__(self):
+		return "<CachedState tasks={:,}, folders={:,}, contexts={:,}, lastEditTask={}, lastDeleteTask={}>".format(
+			len(self.tasks), len(self.folders), len(self.contexts), self.lastEditTask, self.lastDeleteTask)
+
+_timestampNames = ["lastEditTask", "lastDeleteTask", "lastEditFolder", "lastEditContext"]
+
+def _EncodeDate(value):
+	return value.toordinal() if value is not None else None
+
+# memoized since many tasks share the same dates, and bounded since a long-running process may see a lot of them
+@lru_cache(maxsize=4096)
+def _DecodeDate(value):
+	return date.fromordinal(value) if value is not None else None
+
+def _EncodeDatetime(value):
+	return value.timestamp() if value is not None else None
+
+def _DecodeDatetime(value):
+	return datetime.fromtimestamp(value) if value is not None else None
+
+def _EnumCodec(enumType):
+	lookup = {x.value: x for x in enumType}
+	return (lambda value: value.value), lookup.__getitem__
+
+_dateCodec = (_EncodeDate, _DecodeDate)
+_datetimeCodec = (_EncodeDatetime, _DecodeDatetime)
+
+def _Dumps(value):
+	# a fixed pickle protocol so that the files read the same on every Python version this supports
+	return dumps(value, protocol=4)
+
+class _RowCodec:
+	"""Converts objects to and from tuples of picklable values.
+	The first element of the tuple is a bitmask of which attributes are set so that partial objects survive a round trip"""
+
+	def __init__(self, type_, fields):
+		self.type_ = type_
+		# (name, encoder, decoder) - None means the value is stored as-is
+		self.fields = [(name, codec[0], codec[1]) if codec is not None else (name, None, None) for name, codec in fields]
+		self.decoders = {}
+
+	def Encode(self, item):
+		"""Object to tuple"""
+		mask = 0
+		row = [0]
+		for bit, (name, encoder, _) in enumerate(self.fields):
+			if hasattr(item, name):
+				mask |= 1 << bit
+				value = getattr(item, name)
+				row.append(encoder(value) if encoder is not None else value)
+		row[0] = mask
+		return tuple(row)
+
+	def _Decoder(self, mask):
+		# objects loaded with the same fields share the same mask so the per-mask work is done once.
+		# The slot descriptors set the attributes without going through __init__ or __setattr__, so the objects come out as if they had just been loaded from the API
+		decoder = self.decoders.get(mask)
+		if decoder is None:
+			decoder = [(getattr(self.type_, name).__set__, decode) for bit, (name, _, decode) in enumerate(self.fields) if mask & (1 << bit)]
+			self.decoders[mask] = decoder
+		return decoder
+
+	def Decode(self, row):
+		"""Tuple to object"""
+		item = self.type_.__new__(self.type_)
+		for (setter, decode), value in zip(self._Decoder(row[0]), row[1:]):
+			setter(item, decode(value) if decode is not None else value)
+		return item
+
+_taskCodec = _RowCodec(Task, [
+	("id_", None),
+	("title", None),
+	("tags", None),
+	("startDate", _dateCodec),
+	("dueDate", _dateCodec),
+	("modified", _datetimeCodec),
+	("completedDate", _dateCodec),
+	("star", None),
+	("priority", _EnumCodec(Priority)),
+	("dueDateModifier", _EnumCodec(DueDateModifier)),
+	("status", _EnumCodec(Status)),
+	("length", None),
+	("note", None),
+	("repeat", None),
+	("parent", None),
+	("folderId", None),
+	("contextId", None)])
+
+_folderCodec = _RowCodec(Folder, [("id_", None), ("name", None), ("private", None), ("archived", None), ("order", None)])
+
+_contextCodec = _RowCodec(Context, [("id_", None), ("name", None), ("private", None)])
+
+class TaskCacheFile:
+	"""Stores the cached state as a single compact binary file which is rewritten on every save"""
+	# bump this whenever the row layout changes so that old files are ignored rather than misread
+	formatVersion = 2
+
+	def __init__(self, path):
+		self.path = path
+
+	def Save(self, state):
+		"""Save the given CachedState"""
+		payload = _Dumps((
+			TaskCacheFile.formatVersion,
+			[_EncodeDatetime(getattr(state, name)) for name in _timestampNames],
+			[_taskCodec.Encode(x) for x in state.tasks],
+			[_folderCodec.Encode(x) for x in state.folders],
+			[_contextCodec.Encode(x) for x in state.contexts]))
+		# write then rename so that a crash never leaves a truncated cache behind
+		_ReplaceFile(self.path, lambda f: f.write(payload), binary=True)
+
+	def Load(self):
+		"""Load and return the CachedState or None if there is no usable cache"""
+		try:
+			with open(self.path, "rb") as f:
+				version, timestamps, tasks, folders, contexts = loads(f.read())
+		except FileNotFoundError:
+			return None
+		except (EOFError, UnpicklingError, ValueError, TypeError):
+			return None
+		if version != TaskCacheFile.formatVersion:
+			return None
+		state = CachedState(
+			tasks=[_taskCodec.Decode(x) for x in tasks],
+			folders=[_folderCodec.Decode(x) for x in folders],
+			contexts=[_contextCodec.Decode(x) for x in contexts])
+		for name, value in zip(_timestampNames, timestamps):
+			setattr(state, name, _DecodeDatetime(value))
+		return state
+
+class TaskCacheSqlite:
+	"""Stores the cached state in a SQLite database with one row per task, keyed by id, along with its modified timestamp"""
+	formatVersion = 2
+
+	def __init__(self, path):
+		self.path = path
+
+	def _Connect(self):
+		connection = connect(self.path)
+		connection.executescript("""
+			CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value);
+			CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY, modified REAL, row BLOB NOT NULL);
+			CREATE TABLE IF NOT EXISTS folders (id INTEGER PRIMARY KEY, row BLOB NOT NULL);
+			CREATE TABLE IF NOT EXISTS contexts (id INTEGER PRIMARY KEY, row BLOB NOT NULL);
+		""")
+		return connection
+
+	def Save(self, state):
+		"""Save the given CachedState"""
+		connection = self._Connect()
+		try:
+			with connection:
+				connection.execute("DELETE FROM meta")
+				connection.executemany("INSERT INTO meta VALUES (?, ?)",
+					[(name, _EncodeDatetime(getattr(state, name))) for name in _timestampNames] + [("formatVersion", TaskCacheSqlite.formatVersion)])
+				connection.execute("DELETE FROM tasks")
+				connection.executemany("INSERT INTO tasks VALUES (?, ?, ?)",
+					[(x.id_, _EncodeDatetime(getattr(x, "modified", None)), _Dumps(_taskCodec.Encode(x))) for x in state.tasks])
+				connection.execute("DELETE FROM folders")
+				connection.executemany("INSERT INTO folders VALUES (?, ?)", [(x.id_, _Dumps(_folderCodec.Encode(x))) for x in state.folders])
+				connection.execute("DELETE FROM contexts")
+				connection.executemany("INSERT INTO contexts VALUES (?, ?)", [(x.id_, _Dumps(_contextCodec.Encode(x))) for x in state.contexts])
+		finally:
+			connection.close()
+
+	def Load(self):
+		"""Load and return the CachedState or None if there is no usable cache"""
+		connection = self._Connect()
+		try:
+			meta = dict(connection.execute("SELECT name, value FROM meta"))
+			if meta.get("formatVersion") != TaskCacheSqlite.formatVersion:
+				return None
+			state = CachedState(
+				tasks=[_taskCodec.Decode(loads(x)) for x, in connection.execute("SELECT row FROM tasks")],
+				folders=[_folderCodec.Decode(loads(x)) for x, in connection.execute("SELECT row FROM folders")],
+				contexts=[_contextCodec.Decode(loads(x)) for x, in connection.execute("SELECT row FROM contexts")])
+		finally:
+			connection.close()
+		for name in _timestampNames:
+			setattr(state, name, _DecodeDatetime(meta.get(name)))
+		return state
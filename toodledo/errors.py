@@ -43,3 +43,4 @@ class ToodledoError(Exception):
 	def __init__(self, errorCode):
 		errorMessage = ToodledoError.errorCodeToMessage.get(errorCode, "Unknown error")
 		super().__init__(errorMessage, errorCode)
+		self.errorCode = errorCode
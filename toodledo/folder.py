@@ -5,12 +5,14 @@ from .custom_fields import _ToodledoBoolean
 
 class Folder: # pylint: disable=too-few-public-methods
 	"""Toodledo folder"""
+	__slots__ = ("id_", "name", "private", "archived", "order")
+
 	def __init__(self, **data):
 		for name, item in data.items():
 			setattr(self, name, item)
 
 	def __repr__(self):
-		attributes = sorted(["{}={}".format(name, item) for name, item in self.__dict__.items()])
+		attributes = sorted(["{}={}".format(name, getattr(self, name)) for name in self.__slots__ if hasattr(self, name)])
 		return "<Folder {}>".format(", ".join(attributes))
 
 class _FolderSchema(Schema):
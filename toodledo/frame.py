@@ -0,0 +1,116 @@
+"""Columnar export of tasks to pandas and pyarrow, which are imported when needed"""
+
+from .types import DueDateModifier, Priority, Status
+
+_secondsPerDay = 24 * 60 * 60
+
+# (API field name, column name, kind) in the same order as the Task attributes
+_columnKinds = [
+	("id", "id_", "int"),
+	("title", "title", "string"),
+	("tag", "tags", "tags"),
+	("startdate", "startDate", "date"),
+	("duedate", "dueDate", "date"),
+	("modified", "modified", "datetime"),
+	("completed", "completedDate", "date"),
+	("star", "star", "bool"),
+	("priority", "priority", Priority),
+	("duedatemod", "dueDateModifier", DueDateModifier),
+	("status", "status", Status),
+	("length", "length", "int"),
+	("note", "note", "string"),
+	("repeat", "repeat", "string"),
+	("parent", "parent", "int"),
+	("folder", "folderId", "listId"),
+	("context", "contextId", "listId")
+]
+
+class _Column: # pylint: disable=too-few-public-methods
+	"""A decoded column - numpy values and a mask of the missing ones.
+	categories is set for the enum columns, whose values are codes, and offsets for the tags, whose values are all the tags in one array"""
+	def __init__(self, name, kind, values, mask=None, categories=None, offsets=None): # pylint: disable=too-many-arguments
+		self.name = name
+		self.kind = kind
+		self.values = values
+		self.mask = mask
+		self.categories = categories
+		self.offsets = offsets
+
+def _Integers(numpy, raw):
+	mask = numpy.array([x is None for x in raw], dtype=bool)
+	return numpy.array([0 if x is None else x for x in raw], dtype=numpy.int64), mask
+
+def _DecodeColumn(numpy, name, kind, raw): # pylint: disable=too-many-return-statements
+	if kind in ("int", "listId", "bool"):
+		values, mask = _Integers(numpy, raw)
+		if kind == "bool":
+			return _Column(name, kind, values == 1, mask)
+		# 0 means no folder or context
+		return _Column(name, kind, values, mask | (values == 0) if kind == "listId" else mask)
+	if kind in ("date", "datetime"):
+		values, mask = _Integers(numpy, raw)
+		# 0 means unset. Toodledo dates are timestamps of noon GMT on the day
+		mask |= values == 0
+		if kind == "date":
+			values = (values // _secondsPerDay).astype("datetime64[D]")
+		else:
+			values = values.astype("datetime64[s]")
+		values[mask] = numpy.datetime64("NaT")
+		return _Column(name, kind, values, mask)
+	if kind == "string":
+		values = numpy.array(raw, dtype=object)
+		return _Column(name, kind, values, values == None) # pylint: disable=singleton-comparison
+	if kind == "tags":
+		# flattened with offsets, as arrow stores lists
+		lists = [[y.strip() for y in x.split(",")] if x else [] for x in raw]
+		offsets = numpy.zeros(len(lists) + 1, dtype=numpy.int32)
+		numpy.cumsum([len(x) for x in lists], out=offsets[1:])
+		return _Column(name, kind, numpy.array([y for x in lists for y in x], dtype=object), offsets=offsets)
+	# an enum - the codes are the positions of the values in the categories
+	categories = list(kind)
+	codeOf = {x.value: code for code, x in enumerate(categories)}
+	codes = numpy.array([codeOf.get(x, -1) for x in raw], dtype=numpy.int8)
+	return _Column(name, "enum", codes, codes < 0, [x.name for x in categories])
+
+def _DecodeColumns(rawTasks, keys):
+	"""Decode the raw task dictionaries column by column. Only the fields that are in the data, and in keys if given, get a column"""
+	import numpy # pylint: disable=import-outside-toplevel
+	presentKeys = set()
+	for rawTask in rawTasks:
+		presentKeys.update(rawTask.keys())
+	if keys is not None:
+		presentKeys &= keys
+	return [_DecodeColumn(numpy, name, kind, [x.get(key) for x in rawTasks]) for key, name, kind in _columnKinds if key in presentKeys]
+
+def _PandasColumn(pandas, column):
+	if column.kind == "enum":
+		return pandas.Categorical.from_codes(column.values, categories=column.categories)
+	if column.kind == "tags":
+		offsets = column.offsets.tolist()
+		return [column.values[start:end].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+	if column.kind in ("int", "listId") and column.mask.any():
+		return pandas.arrays.IntegerArray(column.values, column.mask)
+	if column.kind == "bool" and column.mask.any():
+		return pandas.arrays.BooleanArray(column.values, column.mask)
+	return column.values
+
+def _TasksFrame(rawTasks, keys=None):
+	"""pandas DataFrame of the raw task dictionaries"""
+	import pandas # pylint: disable=import-outside-toplevel
+	columns = _DecodeColumns(rawTasks, keys)
+	return pandas.DataFrame({x.name: _PandasColumn(pandas, x) for x in columns}, columns=[x.name for x in columns])
+
+def _ArrowColumn(pyarrow, column):
+	if column.kind == "enum":
+		return pyarrow.DictionaryArray.from_arrays(pyarrow.array(column.values, mask=column.mask), pyarrow.array(column.categories))
+	if column.kind == "tags":
+		return pyarrow.ListArray.from_arrays(pyarrow.array(column.offsets), pyarrow.array(column.values, type=pyarrow.string()))
+	if column.kind == "string":
+		return pyarrow.array(column.values, type=pyarrow.string())
+	return pyarrow.array(column.values, mask=column.mask)
+
+def _TasksTable(rawTasks, keys=None):
+	"""pyarrow Table of the raw task dictionaries"""
+	import pyarrow # pylint: disable=import-outside-toplevel
+	columns = _DecodeColumns(rawTasks, keys)
+	return pyarrow.table({x.name: _ArrowColumn(pyarrow, x) for x in columns})
@@ -0,0 +1,125 @@
+"""Import of Toodledo XML exports"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging import debug, warning
+from xml.etree.ElementTree import iterparse
+
+from .context import Context
+from .folder import Folder
+from .task import Task
+from .types import DueDateModifier, Priority, Status
+
+def _Date(text):
+	# unset dates are either empty or all zeroes
+	if text in ("", "0000-00-00"):
+		return None
+	return datetime.strptime(text, "%Y-%m-%d").date()
+
+def _Convert(name, title, convert, text):
+	"""The value that convert makes of the text, or None, with a warning, for text it can't make sense of"""
+	try:
+		return convert(text)
+	except (KeyError, ValueError):
+		warning("Can't read the {} {!r} of task {!r} - leaving it unset".format(name, text, title))
+		return None
+
+def _TaskFromItem(item, folderId, contextId):
+	"""Convert an <item> element to a Task. folderId and contextId map names to ids"""
+	fields = {child.tag: (child.text or "").strip() for child in item}
+	title = fields.get("title", "")
+	task = Task(title=title)
+	if fields.get("tag", "") != "":
+		task.tags = [x.strip() for x in fields["tag"].split(",")]
+	if fields.get("star", "") != "":
+		task.star = fields["star"] == "1"
+	# values that can't be read, such as unknown labels or malformed dates, are left unset rather than stopping the import
+	converted = [
+		("startdate", "startDate", _Date),
+		("duedate", "dueDate", _Date),
+		("completed", "completedDate", _Date),
+		("priority", "priority", lambda label: Priority[label.upper()]),
+		("status", "status", lambda label: Status[label.upper().replace(" ", "_")]),
+		("duedatemodifier", "dueDateModifier", lambda label: DueDateModifier(int(label))),
+		("length", "length", int)]
+	for name, attribute, convert in converted:
+		if fields.get(name, "") != "":
+			value = _Convert(name, title, convert, fields[name])
+			if value is not None:
+				setattr(task, attribute, value)
+	if fields.get("note", "") != "":
+		task.note = fields["note"]
+	# the API only understands repeats in iCal format
+	if "FREQ=" in fields.get("repeat", ""):
+		task.repeat = fields["repeat"]
+	if fields.get("folder", "") != "":
+		task.folderId = folderId(fields["folder"])
+	if fields.get("context", "") != "":
+		task.contextId = contextId(fields["context"])
+	# parent ids refer to the exporting account so they are left out
+	return task
+
+def _IterItems(source, folderId, contextId):
+	# clear each item once it's converted so that memory use doesn't grow with the size of the document
+	root = None
+	for event, element in iterparse(source, events=("start", "end")):
+		if root is None:
+			root = element
+		elif event == "end" and element.tag == "item":
+			yield _TaskFromItem(element, folderId, contextId)
+			root.clear()
+
+class _NameToId: # pylint: disable=too-few-public-methods
+	"""Looks up folder or context ids by name, optionally creating the missing ones"""
+	def __init__(self, existing, add, makeItem):
+		self.ids = {x.name: x.id_ for x in existing}
+		self.add = add
+		self.makeItem = makeItem
+
+	def __call__(self, name):
+		if name not in self.ids:
+			if self.add is None:
+				warning("No folder or context named {} - leaving it unset".format(name))
+				return None
+			self.ids[name] = self.add(self.makeItem(name)).id_
+		return self.ids[name]
+
+def ImportXml(toodledo, source, parallel=True, createMissing=True):
+	"""Add the tasks from a Toodledo XML export, given as a path or file object, to the account.
+	The document is parsed incrementally and each batch of 50 tasks is uploaded while parsing continues, with at most
+	toodledo.maxWorkers batches in flight, so memory use doesn't depend on the size of the export.
+	Folders and contexts are matched by name and, with createMissing, the ones that don't exist are created.
+	Returns the number of tasks added and a list of (Task, TaskWriteResult) for the ones that failed"""
+	folderId = _NameToId(toodledo.GetFolders(), toodledo.AddFolder if createMissing else None, lambda name: Folder(name=name, private=False))
+	contextId = _NameToId(toodledo.GetContexts(), toodledo.AddContext if createMissing else None, lambda name: Context(name=name, private=False))
+	limit = 50 # single request limit
+	inFlight = toodledo.maxWorkers if parallel else 1
+	added = 0
+	failures = []
+
+	def _Collect(batch, future):
+		nonlocal added
+		for task, result in zip(batch, future.result()):
+			if result.IsError():
+				failures.append((task, result))
+			else:
+				added += 1
+
+	with ThreadPoolExecutor(max_workers=inFlight) as executor:
+		pending = deque()
+		batch = []
+		for task in _IterItems(source, folderId, contextId):
+			batch.append(task)
+			if len(batch) < limit:
+				continue
+			if len(pending) >= inFlight:
+				_Collect(*pending.popleft())
+			pending.append((batch, executor.submit(toodledo.AddTasks, batch, raiseOnError=False)))
+			batch = []
+		if len(batch) > 0:
+			pending.append((batch, executor.submit(toodledo.AddTasks, batch, raiseOnError=False)))
+		while len(pending) > 0:
+			_Collect(*pending.popleft())
+	debug("Imported {:,} tasks, {:,} failed".format(added, len(failures)))
+	return added, failures
@@ -0,0 +1,78 @@
+"""Cached folder and context lookups"""
+
+from threading import Lock
+from time import monotonic
+
+class _LookupCache:
+	"""Folders or contexts by id and by name. They're fetched when first needed and again once they're ttl seconds old,
+	and kept up to date in between by the writes made through the same Toodledo object"""
+
+	def __init__(self, fetch, ttl):
+		"""fetch gets all the items from the API. ttl of None means they never expire"""
+		self.fetch = fetch
+		self.ttl = ttl
+		self.byId = None
+		self.byName = None
+		# the name each item was stored under, since the objects may have been renamed since
+		self.names = None
+		self.fetchedAt = None
+		# held while fetching so that concurrent lookups wait for the same request
+		self.lock = Lock()
+
+	def _IsStale(self):
+		return self.byId is None or (self.ttl is not None and monotonic() - self.fetchedAt >= self.ttl)
+
+	def _Current(self):
+		with self.lock:
+			if self._IsStale():
+				self._Fill(self.fetch())
+			return self.byId, self.byName
+
+	def _Fill(self, items):
+		self.byId = {x.id_: x for x in items}
+		self.byName = {x.name: x for x in items}
+		self.names = {x.id_: x.name for x in items}
+		self.fetchedAt = monotonic()
+
+	def Fill(self, items):
+		"""Replace the contents with freshly fetched items"""
+		with self.lock:
+			self._Fill(items)
+
+	def ById(self, id_):
+		"""The item with the given id or None"""
+		return self._Current()[0].get(id_)
+
+	def ByName(self, name):
+		"""The item with the given name or None"""
+		return self._Current()[1].get(name)
+
+	def Invalidate(self):
+		"""Fetch the items again on the next lookup"""
+		with self.lock:
+			self.byId = None
+			self.byName = None
+			self.names = None
+
+	def _Forget(self, id_):
+		previous = self.byId.pop(id_, None)
+		name = self.names.pop(id_, None)
+		if previous is not None and self.byName.get(name) is previous:
+			del self.byName[name]
+
+	def Put(self, item):
+		"""Add or replace an item that was written through the API"""
+		with self.lock:
+			if self.byId is None:
+				return
+			self._Forget(item.id_)
+			self.byId[item.id_] = item
+			self.byName[item.name] = item
+			self.names[item.id_] = item.name
+
+	def Remove(self, id_):
+		"""Forget an item that was deleted through the API"""
+		with self.lock:
+			if self.byId is None:
+				return
+			self._Forget(id_)
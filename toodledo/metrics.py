@@ -0,0 +1,133 @@
+"""Instrumentation of the API calls"""
+
+from bisect import bisect_left
+from threading import Lock
+
+class Instrumentation:
+	"""Hooks called by Toodledo and AsyncToodledo for every API call. The methods do nothing - override the ones you need.
+	endpoint is the name of the URL attribute, such as getTasksUrl, and the hooks may be called from several threads at once"""
+
+	def OnRequest(self, endpoint, method, status, seconds, bytesSent, bytesReceived, retries): # pylint: disable=too-many-arguments
+		"""A request completed. seconds is the time spent waiting on the network and retries counts the retries on server errors"""
+
+	def OnThrottled(self, endpoint, status):
+		"""The API throttled a request, either with a 429 status or with error code 3 in a 200 response, and it will be retried"""
+
+	def OnTokenRefresh(self, seconds):
+		"""The token was refreshed"""
+
+	def OnDecode(self, endpoint, stage, seconds, count):
+		"""count items from a response were decoded. stage is "json" for parsing the response, "objects" for turning it into Task
+		and other objects with _TaskSchema or its faster equivalent, or "frame" for turning it into columns"""
+
+	def OnEncode(self, endpoint, seconds, count):
+		"""count items were turned into a request payload"""
+
+class _EndpointMetrics: # pylint: disable=too-few-public-methods,too-many-instance-attributes
+	def __init__(self, buckets):
+		self.requests = 0
+		self.errors = 0
+		self.seconds = 0.0
+		self.bucketCounts = [0] * (len(buckets) + 1)
+		self.bytesSent = 0
+		self.bytesReceived = 0
+		self.retries = 0
+		self.throttled = 0
+		# by stage
+		self.decodeSeconds = {}
+		self.decoded = {}
+		self.encodeSeconds = 0.0
+		self.encoded = 0
+
+class ApiMetrics(Instrumentation):
+	"""Instrumentation that totals everything per endpoint. Snapshot gives the totals as a dictionary and
+	Samples gives them as (name, labels, value) in the form that Prometheus and OpenTelemetry exporters expect,
+	including a cumulative histogram of the request latencies"""
+
+	# upper bounds of the latency histogram buckets, in seconds
+	buckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+	def __init__(self):
+		self.lock = Lock()
+		self.endpoints = {}
+		self.tokenRefreshes = 0
+		self.tokenRefreshSeconds = 0.0
+
+	def _Endpoint(self, endpoint):
+		metrics = self.endpoints.get(endpoint)
+		if metrics is None:
+			metrics = _EndpointMetrics(ApiMetrics.buckets)
+			self.endpoints[endpoint] = metrics
+		return metrics
+
+	def OnRequest(self, endpoint, method, status, seconds, bytesSent, bytesReceived, retries): # pylint: disable=too-many-arguments
+		with self.lock:
+			metrics = self._Endpoint(endpoint)
+			metrics.requests += 1
+			if status >= 400:
+				metrics.errors += 1
+			metrics.seconds += seconds
+			metrics.bucketCounts[bisect_left(ApiMetrics.buckets, seconds)] += 1
+			metrics.bytesSent += bytesSent
+			metrics.bytesReceived += bytesReceived
+			metrics.retries += retries
+
+	def OnThrottled(self, endpoint, status):
+		with self.lock:
+			metrics = self._Endpoint(endpoint)
+			metrics.throttled += 1
+			metrics.retries += 1
+
+	def OnTokenRefresh(self, seconds):
+		with self.lock:
+			self.tokenRefreshes += 1
+			self.tokenRefreshSeconds += seconds
+
+	def OnDecode(self, endpoint, stage, seconds, count):
+		with self.lock:
+			metrics = self._Endpoint(endpoint)
+			metrics.decodeSeconds[stage] = metrics.decodeSeconds.get(stage, 0.0) + seconds
+			metrics.decoded[stage] = metrics.decoded.get(stage, 0) + count
+
+	def OnEncode(self, endpoint, seconds, count):
+		with self.lock:
+			metrics = self._Endpoint(endpoint)
+			metrics.encodeSeconds += seconds
+			metrics.encoded += count
+
+	def Snapshot(self):
+		"""The totals so far as {endpoint: {name: value}}, plus the token refreshes under None"""
+		with self.lock:
+			snapshot = {endpoint: {name: dict(value) if isinstance(value, dict) else value for name, value in vars(metrics).items() if name != "bucketCounts"} for endpoint, metrics in self.endpoints.items()}
+			snapshot[None] = {"tokenRefreshes": self.tokenRefreshes, "tokenRefreshSeconds": self.tokenRefreshSeconds}
+			return snapshot
+
+	def Samples(self):
+		"""The totals so far as a list of (metric name, labels, value)"""
+		counters = [
+			("toodledo_requests_total", "requests"),
+			("toodledo_request_errors_total", "errors"),
+			("toodledo_request_bytes_sent_total", "bytesSent"),
+			("toodledo_request_bytes_received_total", "bytesReceived"),
+			("toodledo_request_retries_total", "retries"),
+			("toodledo_requests_throttled_total", "throttled"),
+			("toodledo_encode_seconds_total", "encodeSeconds"),
+			("toodledo_encoded_items_total", "encoded")]
+		samples = []
+		with self.lock:
+			for endpoint, metrics in sorted(self.endpoints.items()):
+				labels = {"endpoint": endpoint}
+				for name, attribute in counters:
+					samples.append((name, labels, getattr(metrics, attribute)))
+				for stage in sorted(metrics.decodeSeconds):
+					samples.append(("toodledo_decode_seconds_total", dict(labels, stage=stage), metrics.decodeSeconds[stage]))
+					samples.append(("toodledo_decoded_items_total", dict(labels, stage=stage), metrics.decoded[stage]))
+				cumulative = 0
+				for bound, count in zip(ApiMetrics.buckets + (float("inf"),), metrics.bucketCounts):
+					cumulative += count
+					samples.append(("toodledo_request_seconds_bucket", dict(labels, le=str(bound) if bound != float("inf") else "+Inf"), cumulative))
+				samples.append(("toodledo_request_seconds_sum", labels, metrics.seconds))
+				samples.append(("toodledo_request_seconds_count", labels, metrics.requests))
+			samples.append(("toodledo_token_refreshes_total", {}, self.tokenRefreshes))
+			samples.append(("toodledo_token_refresh_seconds_total", {}, self.tokenRefreshSeconds))
+		return samples
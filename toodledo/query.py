@@ -0,0 +1,59 @@
+"""Typed task queries"""
+
+from .task import Task, _TaskSchema
+
+# attribute name to API field name
+_apiKeys = {name: field.load_from or name for name, field in _TaskSchema._declared_fields.items()} # pylint: disable=protected-access,no-member
+
+# returned whether or not they're asked for
+_defaultKeys = frozenset(["id", "title", "modified", "completed"])
+
+def _Timestamp(value):
+	return int(value.timestamp())
+
+class TaskQuery:
+	"""Which tasks to get and which of their attributes, for GetTasks and the other calls that take params.
+	Only the attributes in fields are requested and decoded - the others are left unset on the tasks"""
+
+	def __init__(self, fields=(), completed=None, modifiedAfter=None, modifiedBefore=None, id_=None): # pylint: disable=too-many-arguments
+		"""fields is the Task attribute names to get - id_ is always included.
+		completed is None for all tasks, True for only completed ones or False for only uncompleted ones.
+		modifiedAfter and modifiedBefore are optional datetimes bounding when the tasks were last modified.
+		id_ gets a single task"""
+		unknown = set(fields) - set(Task.fieldNames)
+		if len(unknown) > 0:
+			raise ValueError("Unknown task attributes: {}".format(", ".join(sorted(unknown))))
+		self.fields = frozenset(fields) | {"id_"}
+		self.completed = completed
+		self.modifiedAfter = modifiedAfter
+		self.modifiedBefore = modifiedBefore
+		self.id_ = id_
+
+	def __repr__(self):
+		return "<TaskQuery {}>".format(self.ToParams())
+
+	def _Keys(self):
+		"""The API field names to decode"""
+		return frozenset(_apiKeys[name] for name in self.fields)
+
+	def ToParams(self):
+		"""The equivalent params dictionary, asking for as little as possible"""
+		params = {}
+		optionalKeys = self._Keys() - _defaultKeys
+		if len(optionalKeys) > 0:
+			params["fields"] = ",".join(sorted(optionalKeys))
+		if self.completed is not None:
+			params["comp"] = 1 if self.completed else 0
+		if self.modifiedAfter is not None:
+			params["modafter"] = _Timestamp(self.modifiedAfter)
+		if self.modifiedBefore is not None:
+			params["modbefore"] = _Timestamp(self.modifiedBefore)
+		if self.id_ is not None:
+			params["id"] = self.id_
+		return params
+
+def _ParamsAndKeys(params):
+	"""The params dictionary for either a params dictionary or a TaskQuery, and the API fields to decode or None for all of them"""
+	if isinstance(params, TaskQuery):
+		return params.ToParams(), params._Keys() # pylint: disable=protected-access
+	return params, None
@@ -0,0 +1,129 @@
+"""Client-side rate limiting"""
+
+from json import dump, load
+from threading import Lock
+from time import sleep, time
+
+try:
+	from fcntl import flock, LOCK_EX, LOCK_UN
+except ImportError:
+	flock = None
+
+class RateLimiter: # pylint: disable=too-many-instance-attributes
+	"""Token bucket shared by all the calls made through the Toodledo objects it is given to.
+	The rate adapts AIMD-style - it creeps up by increase on every successful request and is multiplied by decrease whenever the API throttles us.
+	With a lockPath, the bucket lives in that file and is shared by every process using the same path (requires fcntl)"""
+
+	def __init__(self, rate=5.0, burst=10, minRate=0.1, maxRate=20.0, increase=0.05, decrease=0.5, lockPath=None): # pylint: disable=too-many-arguments
+		"""rate is in requests per second"""
+		if lockPath is not None and flock is None:
+			raise OSError("Sharing a rate limiter between processes requires fcntl, which this platform doesn't have")
+		self.rate = rate
+		self.burst = burst
+		self.minRate = minRate
+		self.maxRate = maxRate
+		self.increase = increase
+		self.decrease = decrease
+		self.lockPath = lockPath
+		self.tokens = float(burst)
+		self.updated = time()
+		self.lock = Lock()
+		# metrics
+		self.requests = 0
+		self.throttleEvents = 0
+		self.throttledSeconds = 0.0
+
+	def _Update(self, change):
+		# run change on the bucket state under the thread lock and, if shared, the file lock
+		with self.lock:
+			if self.lockPath is None:
+				return change()
+			with open(self.lockPath, "a+", encoding="utf-8") as f:
+				flock(f, LOCK_EX)
+				try:
+					f.seek(0)
+					try:
+						state = load(f)
+						self.tokens, self.updated, self.rate = state["tokens"], state["updated"], state["rate"]
+					except ValueError:
+						pass # new or corrupt file - start from our own state
+					result = change()
+					f.seek(0)
+					f.truncate()
+					dump({"tokens": self.tokens, "updated": self.updated, "rate": self.rate}, f)
+					f.flush()
+					return result
+				finally:
+					flock(f, LOCK_UN)
+
+	def _Refill(self):
+		now = time()
+		self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+		self.updated = now
+
+	def Reserve(self):
+		"""Take a token and return how many seconds to wait before using it"""
+		def _Take():
+			self._Refill()
+			self.tokens -= 1
+			self.requests += 1
+			# a negative balance is a queue of callers who have already reserved their slot
+			return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+		return self._Update(_Take)
+
+	def Acquire(self):
+		"""Block until a request can be made"""
+		delay = self.Reserve()
+		if delay > 0:
+			with self.lock:
+				self.throttledSeconds += delay
+			sleep(delay)
+
+	def OnSuccess(self):
+		"""Additive increase after a request that wasn't throttled"""
+		def _Increase():
+			self.rate = min(self.maxRate, self.rate + self.increase)
+		self._Update(_Increase)
+
+	def OnThrottle(self):
+		"""Multiplicative decrease after a 429 or a "Too many API requests" error. The bucket is emptied so that the next request backs off"""
+		def _Decrease():
+			self._Refill()
+			self.rate = max(self.minRate, self.rate * self.decrease)
+			self.tokens = min(self.tokens, 0.0)
+			self.throttleEvents += 1
+		self._Update(_Decrease)
+
+	def Metrics(self):
+		"""Return a dictionary of the current rate and the counters"""
+		with self.lock:
+			return {
+				"rate": self.rate,
+				"requests": self.requests,
+				"throttleEvents": self.throttleEvents,
+				"throttledSeconds": self.throttledSeconds
+			}
+
+class _RateLimiters:
+	"""Several rate limiters applied to the same requests, such as one per account and one shared by all of them"""
+
+	def __init__(self, limiters, adaptive=None):
+		"""The limiters are acquired in order, so the narrower ones should come first to avoid holding a slot in the wider ones while waiting.
+		adaptive are the ones told about successes and throttling, by default all of them"""
+		self.limiters = limiters
+		self.adaptive = adaptive if adaptive is not None else limiters
+
+	def Acquire(self):
+		"""Block until every limiter allows a request"""
+		for limiter in self.limiters:
+			limiter.Acquire()
+
+	def OnSuccess(self):
+		"""Additive increase of every adaptive limiter"""
+		for limiter in self.adaptive:
+			limiter.OnSuccess()
+
+	def OnThrottle(self):
+		"""Multiplicative decrease of every adaptive limiter"""
+		for limiter in self.adaptive:
+			limiter.OnThrottle()
@@ -0,0 +1,88 @@
+"""Bringing the remote tasks in line with a desired list"""
+
+from .task import Task, _TaskEncoders
+
+class ReconcilePlan: # pylint: disable=too-few-public-methods
+	"""The writes that make the remote tasks match the desired ones - the desired tasks to add, a task with the id and only the changed
+	attributes for each edit, and the remote tasks to delete. Once run, the results of each kind of write are set too"""
+	def __init__(self):
+		self.adds = []
+		self.edits = []
+		self.deletes = []
+		self.addResults = None
+		self.editResults = None
+		self.deleteResults = None
+
+	def __repr__(self):
+		return "<ReconcilePlan adds={:,}, edits={:,}, deletes={:,}>".format(len(self.adds), len(self.edits), len(self.deletes))
+
+	def __len__(self):
+		"""The number of writes"""
+		return len(self.adds) + len(self.edits) + len(self.deletes)
+
+def _KeyFunction(key):
+	if callable(key):
+		return key
+	return lambda task: getattr(task, key, None)
+
+# set by the API, so never sent as edits
+_readOnlyNames = frozenset(["modified"])
+
+def _Fields(desiredTasks, key, fields):
+	"""The attributes to fetch and compare - the given ones or all those set on any desired task, plus the key if it's an attribute name.
+	A key function may read anything, so then the fields have to be given"""
+	if callable(key) and fields is None:
+		raise ValueError("fields must be given, including the attributes that key reads, when key is a function")
+	if fields is None:
+		fields = {name for task in desiredTasks for name in Task.fieldNames if hasattr(task, name)}
+	fields = set(fields) - {"id_"}
+	if not callable(key):
+		fields.add(key)
+	return fields
+
+def _Changes(desired, current, fields, encoders):
+	"""The attributes in fields that are set on the desired task, can be edited and differ from the current one"""
+	changes = {}
+	for name in fields:
+		if name in _readOnlyNames or not hasattr(desired, name):
+			continue
+		value = getattr(desired, name)
+		if not hasattr(current, name) or encoders[name](getattr(current, name)) != encoders[name](value):
+			changes[name] = value
+	return changes
+
+def _Plan(desiredTasks, currentTasks, key, fields, delete):
+	"""Match the tasks by key and compare the attributes in fields by their encoded values, as sent to the API, so that
+	equivalent values such as the same tags in a different order aren't edits. Desired tasks whose key is None, such as new tasks
+	without an id, are always added and current tasks whose key is None are left alone"""
+	key = _KeyFunction(key)
+	encoders = {name: convert for name, _, convert in _TaskEncoders()}
+	plan = ReconcilePlan()
+	desiredByKey = {}
+	for task in desiredTasks:
+		taskKey = key(task)
+		if taskKey is None:
+			plan.adds.append(task)
+			continue
+		if taskKey in desiredByKey:
+			raise ValueError("More than one desired task has the key {!r}".format(taskKey))
+		desiredByKey[taskKey] = task
+	matched = {}
+	for task in currentTasks:
+		taskKey = key(task)
+		if taskKey is None:
+			continue
+		if taskKey in desiredByKey and taskKey not in matched:
+			matched[taskKey] = task
+		elif delete:
+			# including duplicates of a matched task
+			plan.deletes.append(task)
+	for taskKey, task in desiredByKey.items():
+		current = matched.get(taskKey)
+		if current is None:
+			plan.adds.append(task)
+			continue
+		changes = _Changes(task, current, fields, encoders)
+		if len(changes) > 0:
+			plan.edits.append(Task(id_=current.id_, **changes))
+	return plan
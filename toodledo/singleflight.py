@@ -0,0 +1,73 @@
+"""Sharing identical reads"""
+
+from threading import Event, Lock
+from time import monotonic
+
+def _ReadKey(url, params):
+	"""The same key for the same request however the params were written"""
+	return url, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+
+class _Call: # pylint: disable=too-few-public-methods
+	def __init__(self):
+		self.done = Event()
+		self.value = None
+		self.exception = None
+
+class _SingleFlight:
+	"""Identical reads made at the same time share a single call - the first caller makes it and the others wait for its result or exception.
+	With a ttl, results are also kept for that many seconds, until Invalidate"""
+
+	def __init__(self, ttl=None):
+		"""ttl of None means results are only shared while the call is running"""
+		self.ttl = ttl
+		self.lock = Lock()
+		self.inFlight = {}
+		# key to (when it was fetched, value)
+		self.results = {}
+		# bumped by Invalidate so that calls which started before it don't cache their results
+		self.generation = 0
+
+	def _Prune(self):
+		now = monotonic()
+		for key in [key for key, (fetchedAt, _) in self.results.items() if now - fetchedAt >= self.ttl]:
+			del self.results[key]
+
+	def Do(self, key, fetch):
+		"""Return the result of fetch, or of the identical call already running, or the cached result"""
+		with self.lock:
+			if self.ttl is not None:
+				self._Prune()
+				cached = self.results.get(key)
+				if cached is not None:
+					return cached[1]
+			generation = self.generation
+			call = self.inFlight.get(key)
+			leader = call is None
+			if leader:
+				call = _Call()
+				self.inFlight[key] = call
+		if not leader:
+			call.done.wait()
+			if call.exception is not None:
+				raise call.exception
+			return call.value
+		try:
+			call.value = fetch()
+			return call.value
+		except BaseException as e:
+			call.exception = e
+			raise
+		finally:
+			with self.lock:
+				if self.inFlight.get(key) is call:
+					del self.inFlight[key]
+				if self.ttl is not None and call.exception is None and generation == self.generation:
+					self.results[key] = (monotonic(), call.value)
+			call.done.set()
+
+	def Invalidate(self):
+		"""Forget the cached results, and make reads from now on start their own calls rather than wait for the running ones"""
+		with self.lock:
+			self.generation += 1
+			self.inFlight = {}
+			self.results = {}
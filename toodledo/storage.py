@@ -1,6 +1,26 @@
 """Token storage"""
 
 from json import dump, load
+from os import fdopen, fsync, remove, replace
+from os.path import basename, dirname
+from tempfile import mkstemp
+
+def _ReplaceFile(path, write, binary=False):
+	"""Call write with a uniquely named temporary file next to path, then rename it over path. Readers never see a half-written file
+	and concurrent writers each write their own temporary file - the last rename wins"""
+	handle, temporaryPath = mkstemp(prefix=basename(path) + ".", suffix=".tmp", dir=dirname(path) or None)
+	try:
+		with fdopen(handle, "wb" if binary else "w") as f:
+			write(f)
+			f.flush()
+			fsync(f.fileno())
+		replace(temporaryPath, path)
+	except BaseException:
+		try:
+			remove(temporaryPath)
+		except OSError:
+			pass
+		raise
 
 class TokenStorageFile:
 	"""Stores the API tokens as a file"""
@@ -10,8 +30,7 @@ class TokenStorageFile:
 
 	def Save(self, token):
 		"""Save the given token. Called by Toodledo class"""
-		with open(self.path, "w") as f:
-			dump(token, f)
+		_ReplaceFile(self.path, lambda f: dump(token, f))
 
 	def Load(self):
 		"""Load and return the token. Called by Toodledo class"""
@@ -0,0 +1,99 @@
+"""Incremental task synchronization"""
+
+from logging import debug
+
+from .cache import CachedState
+
+def _IsNewer(timestamp, lastSeen):
+	if timestamp is None:
+		return False
+	return lastSeen is None or timestamp > lastSeen
+
+class TaskSync: # pylint: disable=too-many-instance-attributes
+	"""Keeps a local snapshot of the tasks up to date, using the account's last edit and delete timestamps
+	to only download what changed since the previous sync"""
+
+	def __init__(self, toodledo, fields="", parallel=False, cache=None, syncFolders=False, syncContexts=False): # pylint: disable=too-many-arguments
+		"""fields is the same comma-separated list of optional fields that GetTasks accepts.
+		cache is an optional TaskCacheFile or TaskCacheSqlite - the snapshot is loaded from it straight away and saved to it whenever a sync changes something.
+		syncFolders and syncContexts also keep the folders and contexts up to date"""
+		self.toodledo = toodledo
+		self.fields = fields
+		self.parallel = parallel
+		self.cache = cache
+		self.syncFolders = syncFolders
+		self.syncContexts = syncContexts
+		self.tasks = {}
+		self.folders = []
+		self.contexts = []
+		self.lastEditTask = None
+		self.lastDeleteTask = None
+		self.lastEditFolder = None
+		self.lastEditContext = None
+		self.initialized = False
+		if cache is not None:
+			state = cache.Load()
+			if state is not None:
+				self._Restore(state)
+
+	def _Restore(self, state):
+		self.tasks = {task.id_: task for task in state.tasks}
+		self.folders = state.folders
+		self.contexts = state.contexts
+		self.lastEditTask = state.lastEditTask
+		self.lastDeleteTask = state.lastDeleteTask
+		self.lastEditFolder = state.lastEditFolder
+		self.lastEditContext = state.lastEditContext
+		self.initialized = True
+
+	def State(self):
+		"""Return the snapshot as a CachedState"""
+		return CachedState(list(self.tasks.values()), self.folders, self.contexts, self.lastEditTask, self.lastDeleteTask, self.lastEditFolder, self.lastEditContext)
+
+	def _Params(self, **extra):
+		params = {"fields": self.fields} if self.fields else {}
+		params.update(extra)
+		return params
+
+	def Sync(self):
+		"""Bring the snapshot up to date and return a tuple of the tasks that were added or edited and the ids of the tasks that were deleted.
+		When loaded from a cache, the snapshot can be used straight away and this then only fetches what changed since it was saved"""
+		# read the timestamps before the tasks so that changes made during the sync are picked up next time
+		account = self.toodledo.GetAccount()
+		changed = not self.initialized
+		edited = []
+		deletedIds = []
+		if not self.initialized:
+			debug("Initial sync - fetching all tasks")
+			edited = self.toodledo.GetTasks(self._Params(), self.parallel)
+			self.tasks = {}
+		else:
+			if _IsNewer(account.lastEditTask, self.lastEditTask):
+				after = self.lastEditTask.timestamp() if self.lastEditTask is not None else 0
+				# modafter is exclusive so step back a second - merging the same task twice is harmless
+				edited = self.toodledo.GetTasks(self._Params(modafter=max(int(after) - 1, 0)), self.parallel)
+				changed = True
+			if _IsNewer(account.lastDeleteTask, self.lastDeleteTask):
+				deletedIds = self.toodledo.GetDeletedTasks(self.lastDeleteTask)
+				changed = True
+			debug("Sync found {:,} edited and {:,} deleted tasks".format(len(edited), len(deletedIds)))
+
+		if self.syncFolders and (not self.initialized or _IsNewer(account.lastEditFolder, self.lastEditFolder)):
+			self.folders = self.toodledo.GetFolders()
+			changed = True
+		if self.syncContexts and (not self.initialized or _IsNewer(account.lastEditContext, self.lastEditContext)):
+			self.contexts = self.toodledo.GetContexts()
+			changed = True
+
+		for task in edited:
+			self.tasks[task.id_] = task
+		for id_ in deletedIds:
+			self.tasks.pop(id_, None)
+		self.lastEditTask = account.lastEditTask
+		self.lastDeleteTask = account.lastDeleteTask
+		self.lastEditFolder = account.lastEditFolder
+		self.lastEditContext = account.lastEditContext
+		self.initialized = True
+		if changed and self.cache is not None:
+			self.cache.Save(self.State())
+		return edited, deletedIds
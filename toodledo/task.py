@@ -1,25 +1,65 @@
 """Task-related stuff"""
 
+from datetime import date, datetime
+
 from marshmallow import fields, post_load, Schema
 from marshmallow.validate import Length
 
 from .custom_fields import _ToodledoBoolean, _ToodledoDate, _ToodledoDatetime, _ToodledoDueDateModifier, _ToodledoListId, _ToodledoPriority, _ToodledoStatus, _ToodledoTags
+from .types import DueDateModifier, Priority, Status
+
+# orjson, from the fast extra, if it's installed
+try:
+	from orjson import dumps as _orjsonDumps
+	def _JsonDumps(value):
+		return _orjsonDumps(value).decode()
+except ImportError:
+	from json import dumps as _JsonDumps
+
+_missing = object()
 
 class Task:
-	"""Represents a single task"""
+	"""Represents a single task.
+	Attributes that haven't been set, for example because they weren't requested from the API, don't exist so hasattr can be used to check for them.
+	Tasks remember which attributes were set since they were loaded so that EditTasks only sends those"""
+	fieldNames = (
+		"id_", "title", "tags", "startDate", "dueDate", "modified", "completedDate", "star", "priority",
+		"dueDateModifier", "status", "length", "note", "repeat", "parent", "folderId", "contextId")
+	__slots__ = fieldNames + ("_dirty",)
 
 	def __init__(self, **data):
 		for name, item in data.items():
 			setattr(self, name, item)
 
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		# the id identifies the task rather than being a change to it
+		if name != "id_":
+			try:
+				self._dirty.add(name)
+			except AttributeError:
+				object.__setattr__(self, "_dirty", {name})
+
 	def __repr__(self):
-		attributes = sorted(["{}={}".format(name, item) for name, item in self.__dict__.items()])
+		attributes = sorted(["{}={}".format(name, getattr(self, name)) for name in Task.fieldNames if hasattr(self, name)])
 		return "<Task {}>".format(", ".join(attributes))
 
 	def IsComplete(self):
 		"""Indicate whether this task is complete"""
 		return self.completedDate is not None # pylint: disable=no-member
 
+	def DirtyFields(self):
+		"""The names of the attributes set since the task was loaded or last saved"""
+		return frozenset(getattr(self, "_dirty", ()))
+
+	def IsDirty(self):
+		"""Indicate whether the task has changes that haven't been saved"""
+		return len(getattr(self, "_dirty", ())) > 0
+
+	def MarkClean(self):
+		"""Forget the changes, for example once they've been saved"""
+		object.__setattr__(self, "_dirty", set())
+
 class _TaskSchema(Schema):
 	id_ = fields.Integer(dump_to="id", load_from="id")
 	title = fields.String(validate=Length(max=255))
@@ -41,9 +81,142 @@ class _TaskSchema(Schema):
 
 	@post_load
 	def _MakeTask(self, data): # pylint: disable=no-self-use
-		return Task(**data)
+		task = Task(**data)
+		task.MarkClean()
+		return task
+
+def _MergedTask(*tasks):
+	"""A new task with the attributes set on each of the given tasks, the later ones taking precedence"""
+	merged = Task.__new__(Task)
+	for task in tasks:
+		for name in Task.fieldNames:
+			if hasattr(task, name):
+				# bypassing Task.__setattr__ so that the result is clean
+				object.__setattr__(merged, name, getattr(task, name))
+	return merged
+
+class _EncodedDates(dict):
+	"""Timestamps of dates, as _ToodledoDate serializes them, memoized since many tasks share the same dates"""
+	def __missing__(self, value):
+		encoded = datetime(year=value.year, month=value.month, day=value.day).timestamp()
+		self[value] = encoded
+		return encoded
+
+def _EncodeNullable(convert):
+	return lambda value: convert(value) if value is not None else None
+
+def _TaskEncoders():
+	"""(attribute, API field name, converter) with the same results as the _TaskSchema fields when dumping"""
+	dates = _EncodedDates()
+
+	def _EncodeDate(value):
+		return dates[value] if value is not None else 0
+
+	def _EncodeEnum(value):
+		return value.value
+
+	return [
+		("id_", "id", _EncodeNullable(int)),
+		("title", "title", _EncodeNullable(str)),
+		("tags", "tag", lambda value: ", ".join(sorted(value))),
+		("startDate", "startdate", _EncodeDate),
+		("dueDate", "duedate", _EncodeDate),
+		("modified", "modified", lambda value: value.timestamp() if value is not None else 0),
+		("completedDate", "completed", _EncodeDate),
+		("star", "star", lambda value: 1 if value else 0),
+		("priority", "priority", _EncodeEnum),
+		("dueDateModifier", "duedatemod", _EncodeEnum),
+		("status", "status", _EncodeEnum),
+		("length", "length", _EncodeNullable(int)),
+		("note", "note", _EncodeNullable(str)),
+		("repeat", "repeat", _EncodeNullable(str)),
+		("parent", "parent", _EncodeNullable(int)),
+		("folderId", "folder", lambda value: value if value is not None else 0),
+		("contextId", "context", lambda value: value if value is not None else 0)
+	]
+
+class _TaskEncoder: # pylint: disable=too-few-public-methods
+	"""Encodes each task straight to the JSON text that the API expects, with the same values as _TaskSchema dumps, using orjson if it's installed.
+	With dirtyOnly, only the id and the dirty attributes of each task are encoded"""
+	def __init__(self, dirtyOnly=False):
+		self.dirtyOnly = dirtyOnly
+		self.encoders = _TaskEncoders()
+
+	def __call__(self, taskList):
+		encoded = []
+		for task in taskList:
+			dirty = task.DirtyFields() if self.dirtyOnly else None
+			fields_ = {}
+			for name, key, convert in self.encoders:
+				if dirty is not None and name != "id_" and name not in dirty:
+					continue
+				value = getattr(task, name, _missing)
+				if value is not _missing:
+					fields_[key] = convert(value)
+			encoded.append(_JsonDumps(fields_))
+		return encoded
+
+class _DateCache(dict):
+	"""Dates from timestamps, memoized since many tasks share the same dates"""
+	def __missing__(self, value):
+		converted = date.fromtimestamp(float(value)) if value != 0 else None
+		self[value] = converted
+		return converted
+
+def _LoadDatetime(value):
+	return datetime.fromtimestamp(float(value)) if value != 0 else None
+
+def _LoadTags(value):
+	assert isinstance(value, str)
+	if value == "":
+		return []
+	return [x.strip() for x in value.split(",")]
+
+def _LoadListId(value):
+	assert isinstance(value, int)
+	return value if value != 0 else None
+
+def _TaskLoaders():
+	"""Map from API field name to (attribute setter, converter) with the same results as the _TaskSchema fields.
+	None means the value is used as is. Dates get a fresh cache per call"""
+	dateLoader = _DateCache().__getitem__
+	loaders = {
+		"id": ("id_", int),
+		"title": ("title", None),
+		"tag": ("tags", _LoadTags),
+		"startdate": ("startDate", dateLoader),
+		"duedate": ("dueDate", dateLoader),
+		"modified": ("modified", _LoadDatetime),
+		"completed": ("completedDate", dateLoader),
+		"star": ("star", (1).__eq__),
+		"priority": ("priority", {x.value: x for x in Priority}.__getitem__),
+		"duedatemod": ("dueDateModifier", {x.value: x for x in DueDateModifier}.__getitem__),
+		"status": ("status", {x.value: x for x in Status}.__getitem__),
+		"length": ("length", int),
+		"note": ("note", None),
+		"repeat": ("repeat", None),
+		"parent": ("parent", int),
+		"folder": ("folderId", _LoadListId),
+		"context": ("contextId", _LoadListId)
+	}
+	# the slot descriptors set the attributes without going through __init__
+	return {key: (getattr(Task, name).__set__, convert) for key, (name, convert) in loaders.items()}
 
-def _DumpTaskList(taskList):
-	# TODO - pass many=True to the schema instead of this custom stuff
-	schema = _TaskSchema()
-	return [schema.dump(task).data for task in taskList]
+def _LoadTaskList(rawTasks, keys=None):
+	"""Fast equivalent of loading each of the raw task dictionaries with _TaskSchema. keys optionally limits the API fields that are decoded"""
+	loaders = _TaskLoaders()
+	if keys is not None:
+		loaders = {key: loader for key, loader in loaders.items() if key in keys}
+	newTask = Task.__new__
+	tasks = []
+	for rawTask in rawTasks:
+		task = newTask(Task)
+		for key, value in rawTask.items():
+			loader = loaders.get(key)
+			# unknown fields are ignored and nulls are rejected, as the schema does
+			if loader is None or value is None:
+				continue
+			setter, convert = loader
+			setter(task, convert(value) if convert is not None else value)
+		tasks.append(task)
+	return tasks
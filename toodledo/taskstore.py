@@ -0,0 +1,165 @@
+"""In-memory task store with indexes"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time
+
+from .task import _MergedTask
+
+_missing = object()
+
+def _Bound(name, value, end):
+	"""The bound in the same type as the index values - dates for dueDate and startDate and datetimes for modified, where a date
+	covers the whole day"""
+	if value is None:
+		return None
+	if name == "modified":
+		if not isinstance(value, datetime):
+			return datetime.combine(value, time.max if end else time.min)
+		return value
+	return value.date() if isinstance(value, datetime) else value
+
+class _Selection:
+	"""A set of task ids in a TaskStore, narrowed down by each call. Iterating gives the tasks in id order"""
+
+	def __init__(self, store, ids):
+		self.store = store
+		# None means every task in the store
+		self.ids = ids
+
+	def _Narrow(self, ids):
+		# a copy, so that the selection doesn't change as the store does
+		return _Selection(self.store, set(ids) if self.ids is None else self.ids & ids)
+
+	def Where(self, **values):
+		"""Only the tasks whose attributes have the given values. tag matches tasks that have that tag"""
+		selection = self
+		for name, value in values.items():
+			if name == "tag":
+				ids = self.store.tagIndex.get(value, set())
+			elif name in self.store.hashIndexes:
+				ids = self.store.hashIndexes[name].get(value, set())
+			else:
+				raise ValueError("{} isn't indexed for Where - use one of {}".format(name, ", ".join(TaskStore.hashedNames + ("tag",))))
+			selection = selection._Narrow(ids) # pylint: disable=protected-access
+		return selection
+
+	def Between(self, name, low=None, high=None):
+		"""Only the tasks with a dueDate, startDate or modified from low to high inclusive. Unset dates never match.
+		The bounds can be dates or datetimes - a date bound on modified covers the whole day and a datetime bound on the others just its date"""
+		if name not in self.store.sortedIndexes:
+			raise ValueError("{} isn't indexed for Between - use one of {}".format(name, ", ".join(TaskStore.sortedNames)))
+		keys = self.store.sortedIndexes[name]
+		low = _Bound(name, low, False)
+		high = _Bound(name, high, True)
+		start = bisect_left(keys, (low,)) if low is not None else 0
+		end = bisect_right(keys, (high, float("inf"))) if high is not None else len(keys)
+		return self._Narrow({id_ for _, id_ in keys[start:end]})
+
+	def Ids(self):
+		"""The ids of the selected tasks in order"""
+		return sorted(self.ids if self.ids is not None else self.store.tasks.keys())
+
+	def __iter__(self):
+		tasks = self.store.tasks
+		# skipping the tasks removed from the store since the selection was made
+		return iter([tasks[id_] for id_ in self.Ids() if id_ in tasks])
+
+	def __len__(self):
+		return len(self.ids if self.ids is not None else self.store.tasks)
+
+class TaskStore:
+	"""Holds tasks by id with hash indexes on folderId, contextId, status, priority, star and tags and
+	sorted indexes on dueDate, startDate and modified, so that queries don't scan every task.
+	Pass it to Toodledo.AddTaskListener to keep it up to date with the writes made through that object"""
+
+	hashedNames = ("folderId", "contextId", "status", "priority", "star")
+	sortedNames = ("dueDate", "startDate", "modified")
+
+	def __init__(self, tasks=()):
+		self.tasks = {}
+		self.hashIndexes = {name: {} for name in TaskStore.hashedNames}
+		self.tagIndex = {}
+		self.sortedIndexes = {name: [] for name in TaskStore.sortedNames}
+		# the values each task was indexed under, since the task objects may be changed after they're added
+		self.indexed = {}
+		# the sorted indexes that have been appended to and need sorting, so that adding many tasks sorts once rather than inserting each
+		self.unsorted = set()
+		self.Update(tasks)
+
+	def __len__(self):
+		return len(self.tasks)
+
+	def __contains__(self, id_):
+		return id_ in self.tasks
+
+	def Get(self, id_):
+		"""The task with the given id or None"""
+		return self.tasks.get(id_)
+
+	def Select(self, **values):
+		"""Start a query, optionally with the same arguments as Where"""
+		return _Selection(self, None).Where(**values)
+
+	def _Index(self, task):
+		values = {name: getattr(task, name, _missing) for name in TaskStore.hashedNames + TaskStore.sortedNames}
+		values["tags"] = tuple(getattr(task, "tags", ()))
+		for name in TaskStore.hashedNames:
+			if values[name] is not _missing:
+				self.hashIndexes[name].setdefault(values[name], set()).add(task.id_)
+		for tag in values["tags"]:
+			self.tagIndex.setdefault(tag, set()).add(task.id_)
+		for name in TaskStore.sortedNames:
+			if values[name] is not _missing and values[name] is not None:
+				self.sortedIndexes[name].append((values[name], task.id_))
+				self.unsorted.add(name)
+		self.indexed[task.id_] = values
+
+	def _Unindex(self, id_):
+		values = self.indexed.pop(id_)
+		for name in TaskStore.hashedNames:
+			if values[name] is not _missing:
+				ids = self.hashIndexes[name][values[name]]
+				ids.discard(id_)
+				if len(ids) == 0:
+					del self.hashIndexes[name][values[name]]
+		for tag in values["tags"]:
+			ids = self.tagIndex[tag]
+			ids.discard(id_)
+			if len(ids) == 0:
+				del self.tagIndex[tag]
+		for name in TaskStore.sortedNames:
+			if values[name] is not _missing and values[name] is not None:
+				self._Sort(name)
+				keys = self.sortedIndexes[name]
+				del keys[bisect_left(keys, (values[name], id_))]
+
+	def _Sort(self, name):
+		if name in self.unsorted:
+			self.sortedIndexes[name].sort()
+			self.unsorted.discard(name)
+
+	def Update(self, tasks):
+		"""Add the given tasks. When a task with the same id is already there, the attributes set on the new one are merged into it"""
+		for task in tasks:
+			existing = self.tasks.get(task.id_)
+			if existing is not None:
+				self._Unindex(task.id_)
+				task = _MergedTask(existing, task)
+			self.tasks[task.id_] = task
+			self._Index(task)
+		for name in list(self.unsorted):
+			self._Sort(name)
+
+	def Remove(self, ids):
+		"""Remove the tasks with the given ids, if they're there"""
+		for id_ in ids:
+			if self.tasks.pop(id_, None) is not None:
+				self._Unindex(id_)
+
+	def OnTasksChanged(self, tasks):
+		"""Listener hook for tasks added or edited through a Toodledo object"""
+		self.Update(tasks)
+
+	def OnTasksDeleted(self, ids):
+		"""Listener hook for tasks deleted through a Toodledo object"""
+		self.Remove(ids)
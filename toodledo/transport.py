@@ -1,37 +1,170 @@
 """Implementation"""
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from functools import partial
 from json import dumps
 from logging import debug, error, warning
+from threading import Lock, Timer
+from time import perf_counter, time
 
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session
+from urllib3.util.retry import Retry
 
 from .account import _AccountSchema
+from .batch import _AddResult, _CollectResults, _DeleteResult, _DirtyTasks, _EditResult, _NotifyChanged, _NotifyDeleted, _NotifyEdited, _RunBatches, _SizedChunks, _WithSkipped
 from .context import _ContextSchema
 from .errors import ToodledoError
 from .folder import _FolderSchema
-from .task import _DumpTaskList, _TaskSchema
+from .frame import _TasksFrame, _TasksTable
+from .lookup import _LookupCache
+from .metrics import Instrumentation
+from .query import TaskQuery, _ParamsAndKeys
+from .reconcile import _Fields, _Plan
+from .singleflight import _ReadKey, _SingleFlight
+from .task import _LoadTaskList, _TaskEncoder, _TaskSchema
 
 class AuthorizationNeeded(Exception):
 	"""Thrown when the token storage doesn't contain a token"""
 
+def _IsTooManyRequestsError(response):
+	# errors come back as a dictionary and successful task responses as a list so only dictionaries need parsing
+	if response.content[:1] != b"{":
+		return False
+	try:
+		return response.json().get("errorCode") == 3
+	except ValueError:
+		return False
+
+def _BytesSent(request):
+	body = request.body or b""
+	return len(request.url) + len(body.encode() if isinstance(body, str) else body)
+
+def _AdapterRetries(response):
+	# the retries on server errors happen inside urllib3, which records them on the raw response
+	retries = getattr(response.raw, "retries", None)
+	return len(retries.history) if retries is not None else 0
+
 class ToodledoSession(OAuth2Session):
-	"""Refresh token when we get a 429 error"""
-	def request(self, method, url, data=None, headers=None, withhold_token=False, client_id=None, client_secret=None, **kwargs): # pylint: disable=too-many-arguments
-		response = super(ToodledoSession, self).request(method, url, headers=headers, data=data, **kwargs)
-		if response.status_code != 429:
-			return response
-		warning("Received 429 error - refreshing token and retrying")
-		token = self.refresh_token(Toodledo.tokenUrl, **self.auto_refresh_kwargs)
+	"""Refresh the token shortly before it expires, and again if we get a 429 error, and with a rate limiter, back off and retry whenever the API throttles us.
+	Refreshes are coalesced so that concurrent requests wait for a single refresh rather than each doing their own"""
+
+	# refresh the token this many seconds before it expires
+	refreshMargin = 60
+
+	def __init__(self, rateLimiter=None, maxThrottleRetries=5, backgroundRefresh=False, instrumentation=None, endpointNames=None, **kwargs): # pylint: disable=too-many-arguments
+		"""instrumentation is told about each request under the name that endpointNames gives its URL"""
+		super(ToodledoSession, self).__init__(**kwargs)
+		self.rateLimiter = rateLimiter
+		self.maxThrottleRetries = maxThrottleRetries
+		self.backgroundRefresh = backgroundRefresh
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+		self.endpointNames = endpointNames if endpointNames is not None else {}
+		self._refreshLock = Lock()
+		self._refreshTimer = None
+		self._ScheduleRefresh()
+
+	def _IsExpiring(self):
+		expiresAt = self.token.get("expires_at")
+		return expiresAt is not None and float(expiresAt) - ToodledoSession.refreshMargin <= time()
+
+	def _Refresh(self):
+		debug("Refreshing token")
+		start = perf_counter()
+		token = self.refresh_token(self.auto_refresh_url, **self.auto_refresh_kwargs)
+		self.instrumentation.OnTokenRefresh(perf_counter() - start)
 		self.token_updater(token)
-		return super(ToodledoSession, self).request(method, url, headers=headers, data=data, **kwargs)
+		self._ScheduleRefresh()
+
+	def _RefreshIfExpiring(self):
+		if not self._IsExpiring():
+			return
+		with self._refreshLock:
+			# another thread may have refreshed it while we waited for the lock
+			if self._IsExpiring():
+				self._Refresh()
+
+	def _RefreshUnlessChanged(self, accessToken):
+		with self._refreshLock:
+			if self.access_token == accessToken:
+				self._Refresh()
+
+	def _ScheduleRefresh(self):
+		if not self.backgroundRefresh or self.token.get("expires_at") is None:
+			return
+		if self._refreshTimer is not None:
+			self._refreshTimer.cancel()
+		delay = max(float(self.token["expires_at"]) - ToodledoSession.refreshMargin - time(), 1)
+		self._refreshTimer = Timer(delay, self._BackgroundRefresh)
+		self._refreshTimer.daemon = True
+		self._refreshTimer.start()
+
+	def _BackgroundRefresh(self):
+		try:
+			self._RefreshIfExpiring()
+		except Exception as e: # pylint: disable=broad-except
+			# the next request will try again
+			warning("Background token refresh failed: {}".format(e))
+
+	def close(self):
+		if self._refreshTimer is not None:
+			self._refreshTimer.cancel()
+		super(ToodledoSession, self).close()
+
+	# the retry loop keeps the throttling state, token and timing of each attempt in locals
+	def request(self, method, url, data=None, headers=None, withhold_token=False, client_id=None, client_secret=None, **kwargs): # pylint: disable=too-many-arguments,too-many-locals
+		if withhold_token:
+			# the token request itself
+			return super(ToodledoSession, self).request(method, url, data=data, headers=headers, withhold_token=True, client_id=client_id, client_secret=client_secret, **kwargs)
+		# without a rate limiter, keep to a single retry after refreshing the token
+		retries = self.maxThrottleRetries if self.rateLimiter is not None else 1
+		refreshed = False
+		endpoint = self.endpointNames.get(url, url)
+		for attempt in range(retries + 1):
+			self._RefreshIfExpiring()
+			if self.rateLimiter is not None:
+				self.rateLimiter.Acquire()
+			accessToken = self.access_token
+			start = perf_counter()
+			response = super(ToodledoSession, self).request(method, url, headers=headers, data=data, **kwargs)
+			self.instrumentation.OnRequest(endpoint, method, response.status_code, perf_counter() - start, _BytesSent(response.request), len(response.content), _AdapterRetries(response))
+			if response.status_code == 429:
+				self.instrumentation.OnThrottled(endpoint, 429)
+				if not refreshed:
+					warning("Received 429 error - refreshing token and retrying")
+					self._RefreshUnlessChanged(accessToken)
+					refreshed = True
+			elif self.rateLimiter is not None and _IsTooManyRequestsError(response):
+				self.instrumentation.OnThrottled(endpoint, response.status_code)
+				warning("Too many API requests - backing off, attempt {}".format(attempt + 1))
+			else:
+				if self.rateLimiter is not None:
+					self.rateLimiter.OnSuccess()
+				return response
+			if self.rateLimiter is not None:
+				self.rateLimiter.OnThrottle()
+		return response
+
+def _Adapter(poolConnections, poolMaxSize, maxRetries):
+	# only idempotent requests are retried on server errors - Retry excludes POST by default
+	retry = Retry(total=maxRetries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+	return HTTPAdapter(pool_connections=poolConnections, pool_maxsize=poolMaxSize, max_retries=retry)
 
-class Toodledo:
+def _Endpoints(baseUrl):
+	"""The URLs of all the endpoints, on the given server rather than the real one"""
+	return {name: baseUrl + url[len(Toodledo.baseUrl):] for name, url in vars(Toodledo).items() if name.endswith("Url")}
+
+# one object wraps the whole API, with the configuration and shared state of its calls
+class Toodledo: # pylint: disable=too-many-instance-attributes,too-many-public-methods
 	"""Wrapper for the Toodledo v3 API"""
 	baseUrl = "https://api.toodledo.com/3/"
 	tokenUrl = baseUrl + "account/token.php"
 	getAccountUrl = baseUrl + "account/get.php"
 	getTasksUrl = baseUrl + "tasks/get.php"
 	deleteTasksUrl = baseUrl + "tasks/delete.php"
+	deletedTasksUrl = baseUrl + "tasks/deleted.php"
 	addTasksUrl = baseUrl + "tasks/add.php"
 	editTasksUrl = baseUrl + "tasks/edit.php"
 	getFoldersUrl = baseUrl + "folders/get.php"
@@ -43,177 +176,369 @@ class Toodledo:
 	editContextUrl = baseUrl + "contexts/edit.php"
 	deleteContextUrl = baseUrl + "contexts/delete.php"
 
-	def __init__(self, clientId, clientSecret, tokenStorage, scope):
+	# Task writes are batched by size as well as by the API's limit of 50 tasks. The payload goes in the request body,
+	# so this is only there to keep single requests reasonable - batches of 50 tasks with long notes still fit
+	maxPayloadBytes = 1000000
+
+	def __init__(self, clientId, clientSecret, tokenStorage, scope, poolConnections=10, poolMaxSize=10, maxRetries=3, maxWorkers=4, rateLimiter=None, # pylint: disable=too-many-arguments,too-many-locals
+		baseUrl=None, lookupTtl=300, backgroundRefresh=False, instrumentation=None, adapter=None, readTtl=None):
+		"""poolConnections, poolMaxSize and maxRetries configure the HTTP connection pool shared by all calls on this object.
+		maxWorkers bounds the number of concurrent requests made by the parallel variants of the calls.
+		rateLimiter is an optional RateLimiter, which can be shared with other Toodledo objects.
+		baseUrl points all the calls at another server, such as a local stand-in for testing.
+		lookupTtl is how many seconds the folders and contexts used by FolderById and the like are kept before being fetched again, or None for no limit.
+		The token is kept in memory and refreshed shortly before it expires - with backgroundRefresh, a timer does that so that no request has to wait for it.
+		instrumentation is an optional Instrumentation, such as ApiMetrics, which is told about every request.
+		adapter is an optional requests HTTPAdapter to use instead of the pool configured by the other arguments, so that several Toodledo objects can share one - it isn't closed by Close.
+		Identical reads made at the same time share one request - with readTtl, the responses are also reused for that many seconds, until a write through this object"""
 		self.tokenStorage = tokenStorage
 		self.clientId = clientId
 		self.clientSecret = clientSecret
 		self.scope = scope
+		self.poolConnections = poolConnections
+		self.poolMaxSize = poolMaxSize
+		self.maxRetries = maxRetries
+		self.maxWorkers = maxWorkers
+		self.rateLimiter = rateLimiter
+		self.backgroundRefresh = backgroundRefresh
+		self.adapter = adapter
+		self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+		endpoints = _Endpoints(baseUrl if baseUrl is not None else Toodledo.baseUrl)
+		if baseUrl is not None:
+			for name, url in endpoints.items():
+				setattr(self, name, url)
+		self.endpointNames = {url: name for name, url in endpoints.items()}
+		self._session = None
+		self._sessionLock = Lock()
+		self.taskListeners = []
+		self.folderLookup = _LookupCache(self._FetchFolders, lookupTtl)
+		self.contextLookup = _LookupCache(self._FetchContexts, lookupTtl)
+		self.reads = _SingleFlight(readTtl)
 
 	def _Session(self):
+		# One long-lived session so that connections are kept alive between calls. The token is only read
+		# from storage when the session is created - refreshes update the session and the storage together
+		with self._sessionLock:
+			if self._session is None:
+				self._session = self._CreateSession()
+			return self._session
+
+	def _CreateSession(self):
 		token = self.tokenStorage.Load()
 		if token is None:
 			raise AuthorizationNeeded("No token in storage")
 
-		return ToodledoSession(
+		session = ToodledoSession(
 			client_id=self.clientId, token=token, auto_refresh_kwargs={
 				"client_id": self.clientId,
 				"client_secret": self.clientSecret
-			}, auto_refresh_url=Toodledo.tokenUrl, token_updater=self.tokenStorage.Save)
+			}, auto_refresh_url=self.tokenUrl, token_updater=self.tokenStorage.Save, rateLimiter=self.rateLimiter,
+			backgroundRefresh=self.backgroundRefresh, instrumentation=self.instrumentation, endpointNames=self.endpointNames)
+
+		adapter = self.adapter if self.adapter is not None else _Adapter(self.poolConnections, self.poolMaxSize, self.maxRetries)
+		session.mount("https://", adapter)
+		session.mount("http://", adapter)
+		return session
+
+	def _GetJson(self, url, params=None):
+		def _Fetch():
+			response = self._Session().get(url, params=params)
+			response.raise_for_status()
+			parsed = response.json()
+			# raised here so that errors are never shared or cached
+			if "errorCode" in parsed:
+				error("Toodledo error: {}".format(parsed))
+				raise ToodledoError(parsed["errorCode"])
+			return parsed
+		return self.reads.Do(_ReadKey(url, params), _Fetch)
+
+	def _Post(self, url, data):
+		response = self._Session().post(url, data=data)
+		# anything read before a write may be out of date
+		self.reads.Invalidate()
+		return response
+
+	def Close(self):
+		"""Close the pooled connections. The next call will open a new session"""
+		with self._sessionLock:
+			if self._session is not None:
+				if self.adapter is not None:
+					# it was passed in and may be shared with other objects, so it's left open
+					self._session.adapters.clear()
+				self._session.close()
+				self._session = None
+
+	def _FetchFolders(self):
+		schema = _FolderSchema()
+		return [schema.load(x).data for x in self._GetJson(self.getFoldersUrl)]
 
 	def GetFolders(self):
 		"""Get all the folders as folder objects"""
-		folders = self._Session().get(Toodledo.getFoldersUrl)
-		folders.raise_for_status()
-		schema = _FolderSchema()
-		return [schema.load(x).data for x in folders.json()]
+		folders = self._FetchFolders()
+		self.folderLookup.Fill(folders)
+		return folders
+
+	def FolderById(self, id_):
+		"""Get the folder with the given id, or None, from the folders cached by this object"""
+		return self.folderLookup.ById(id_)
+
+	def FolderByName(self, name):
+		"""Get the folder with the given name, or None, from the folders cached by this object"""
+		return self.folderLookup.ByName(name)
 
 	def AddFolder(self, folder):
 		"""Add folder, return the created folder"""
-		response = self._Session().post(Toodledo.addFolderUrl, params={"name": folder.name, "private": 1 if folder.private else 0})
+		response = self._Post(self.addFolderUrl, data={"name": folder.name, "private": 1 if folder.private else 0})
 		response.raise_for_status()
 		if "errorCode" in response.json():
 			error("Toodledo error: {}".format(response.json()))
 			raise ToodledoError(response.json()["errorCode"])
-		return _FolderSchema().load(response.json()[0]).data
+		added = _FolderSchema().load(response.json()[0]).data
+		self.folderLookup.Put(added)
+		return added
 
 	def DeleteFolder(self, folder):
 		"""Delete folder"""
-		response = self._Session().post(Toodledo.deleteFolderUrl, params={"id": folder.id_})
+		response = self._Post(self.deleteFolderUrl, data={"id": folder.id_})
 		response.raise_for_status()
 		jsonResponse = response.json()
 		if "errorCode" in jsonResponse:
 			error("Toodledo error: {}".format(jsonResponse))
 			raise ToodledoError(jsonResponse["errorCode"])
 		assert jsonResponse == {"deleted": folder.id_}, dumps(jsonResponse)
+		self.folderLookup.Remove(folder.id_)
 
 	def EditFolder(self, folder):
 		"""Edits the given folder to have the given properties"""
 		folderData = _FolderSchema().dump(folder).data
-		response = self._Session().post(Toodledo.editFolderUrl, params=folderData)
+		response = self._Post(self.editFolderUrl, data=folderData)
 		response.raise_for_status()
 		responseAsDict = response.json()
 		if "errorCode" in responseAsDict:
 			error("Toodledo error: {}".format(responseAsDict))
 			raise ToodledoError(responseAsDict["errorCode"])
-		return _FolderSchema().load(responseAsDict[0]).data
+		edited = _FolderSchema().load(responseAsDict[0]).data
+		self.folderLookup.Put(edited)
+		return edited
+
+	def _FetchContexts(self):
+		schema = _ContextSchema()
+		return [schema.load(x).data for x in self._GetJson(self.getContextsUrl)]
 
 	def GetContexts(self):
 		"""Get all the contexts as context objects"""
-		contexts = self._Session().get(Toodledo.getContextsUrl)
-		contexts.raise_for_status()
-		schema = _ContextSchema()
-		return [schema.load(x).data for x in contexts.json()]
+		contexts = self._FetchContexts()
+		self.contextLookup.Fill(contexts)
+		return contexts
+
+	def ContextById(self, id_):
+		"""Get the context with the given id, or None, from the contexts cached by this object"""
+		return self.contextLookup.ById(id_)
+
+	def ContextByName(self, name):
+		"""Get the context with the given name, or None, from the contexts cached by this object"""
+		return self.contextLookup.ByName(name)
+
+	def InvalidateLookups(self):
+		"""Fetch the folders and contexts again on the next call to FolderById and the like, for example after they were changed elsewhere"""
+		self.folderLookup.Invalidate()
+		self.contextLookup.Invalidate()
 
 	def AddContext(self, context):
 		"""Add context, return the created context"""
-		response = self._Session().post(Toodledo.addContextUrl, params={"name": context.name, "private": 1 if context.private else 0})
+		response = self._Post(self.addContextUrl, data={"name": context.name, "private": 1 if context.private else 0})
 		response.raise_for_status()
 		if "errorCode" in response.json():
 			error("Toodledo error: {}".format(response.json()))
 			raise ToodledoError(response.json()["errorCode"])
-		return _ContextSchema().load(response.json()[0]).data
+		added = _ContextSchema().load(response.json()[0]).data
+		self.contextLookup.Put(added)
+		return added
 
 	def DeleteContext(self, context):
 		"""Delete context"""
-		response = self._Session().post(Toodledo.deleteContextUrl, params={"id": context.id_})
+		response = self._Post(self.deleteContextUrl, data={"id": context.id_})
 		response.raise_for_status()
 		jsonResponse = response.json()
 		if "errorCode" in jsonResponse:
 			error("Toodledo error: {}".format(jsonResponse))
 			raise ToodledoError(jsonResponse["errorCode"])
 		assert jsonResponse == {"deleted": context.id_}, dumps(jsonResponse)
+		self.contextLookup.Remove(context.id_)
 
 	def EditContext(self, context):
 		"""Edits the given folder to have the given properties"""
 		contextData = _ContextSchema().dump(context).data
-		response = self._Session().post(Toodledo.editContextUrl, params=contextData)
+		response = self._Post(self.editContextUrl, data=contextData)
 		response.raise_for_status()
 		responseAsDict = response.json()
 		if "errorCode" in responseAsDict:
 			error("Toodledo error: {}".format(responseAsDict))
 			raise ToodledoError(responseAsDict["errorCode"])
-		return _ContextSchema().load(responseAsDict[0]).data
+		edited = _ContextSchema().load(responseAsDict[0]).data
+		self.contextLookup.Put(edited)
+		return edited
 
 	def GetAccount(self):
 		"""Get the Toodledo account"""
-		accountInfo = self._Session().get(Toodledo.getAccountUrl)
-		accountInfo.raise_for_status()
-		return _AccountSchema().load(accountInfo.json()).data
+		return _AccountSchema().load(self._GetJson(self.getAccountUrl)).data
+
+	def _GetTasksPage(self, params, start, limit):
+		debug("Start: {}".format(start))
+		pageParams = dict(params, start=start, num=limit)
+		tasks = self.reads.Do(_ReadKey(self.getTasksUrl, pageParams), partial(self._FetchTasksPage, pageParams))
+		# the first element contains the number of tasks returned and the total number matching the params
+		return tasks[0], tasks[1:]
 
-	def GetTasks(self, params):
-		"""Get the tasks filtered by the given params"""
-		allTasks = []
+	def _FetchTasksPage(self, pageParams):
+		response = self._Session().get(self.getTasksUrl, params=pageParams)
+		response.raise_for_status()
+		start = perf_counter()
+		tasks = response.json()
+		seconds = perf_counter() - start
+		if "errorCode" in tasks:
+			error("Toodledo error: {}".format(tasks))
+			raise ToodledoError(tasks["errorCode"])
+		self.instrumentation.OnDecode("getTasksUrl", "json", seconds, len(tasks) - 1)
+		debug("Retrieved {:,} tasks".format(len(tasks) - 1))
+		return tasks
+
+	def _IterTaskPages(self, params, parallel):
 		limit = 1000 # single request limit
-		start = 0
-		while True:
-			debug("Start: {}".format(start))
-			params["start"] = start
-			params["num"] = limit
-			response = self._Session().get(Toodledo.getTasksUrl, params=params)
-			response.raise_for_status()
-			tasks = response.json()
-			if "errorCode" in tasks:
-				error("Toodledo error: {}".format(tasks))
-				raise ToodledoError(tasks["errorCode"])
-			# the first field contains the count or the error code
-			allTasks.extend(tasks[1:])
-			debug("Retrieved {:,} tasks".format(len(tasks[1:])))
-			if len(tasks[1:]) < limit:
-				break
-			start += limit
-		schema = _TaskSchema()
-		return [schema.load(x).data for x in allTasks]
-
-	def EditTasks(self, taskList):
-		"""Change the existing tasks to be the same as the ones in the given list"""
-		if len(taskList) == 0:
-			return
-		debug("Total tasks to edit: {}".format(len(taskList)))
-		limit = 50 # single request limit
-		start = 0
-		while True:
-			debug("Start: {}".format(start))
-			listDump = _DumpTaskList(taskList[start:start + limit])
-			response = self._Session().post(Toodledo.editTasksUrl, params={"tasks": dumps(listDump)})
-			response.raise_for_status()
-			debug("Response: {},{}".format(response, response.text))
-			taskResponse = response.json()
-			if "errorCode" in taskResponse:
-				raise ToodledoError(taskResponse["errorCode"])
-			if len(taskList[start:start + limit]) < limit:
-				break
-			start += limit
-
-	def AddTasks(self, taskList):
-		"""Add the given tasks"""
-		if len(taskList) == 0:
-			return
-		limit = 50 # single request limit
-		start = 0
-		while True:
-			debug("Start: {}".format(start))
-			listDump = _DumpTaskList(taskList[start:start + limit])
-			response = self._Session().post(Toodledo.addTasksUrl, params={"tasks": dumps(listDump)})
-			response.raise_for_status()
-			if "errorCode" in response.json():
-				raise ToodledoError(response.json()["errorCode"])
-			if len(taskList[start:start + limit]) < limit:
-				break
-			start += limit
-
-	def DeleteTasks(self, taskList):
-		"""Delete the given tasks"""
-		if len(taskList) == 0:
-			return
-		taskIdList = [task.id_ for task in taskList]
+		summary, tasks = self._GetTasksPage(params, 0, limit)
+		yield tasks
+		if parallel:
+			starts = iter(range(limit, summary["total"], limit))
+			with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+				# keep at most maxWorkers pages in flight so that memory stays bounded for a slow consumer
+				pending = deque(executor.submit(self._GetTasksPage, params, start, limit) for start in islice(starts, self.maxWorkers))
+				try:
+					while len(pending) > 0:
+						_, tasks = pending.popleft().result()
+						for start in islice(starts, 1):
+							pending.append(executor.submit(self._GetTasksPage, params, start, limit))
+						yield tasks
+				finally:
+					for future in pending:
+						future.cancel()
+		else:
+			start = 0
+			while len(tasks) == limit:
+				start += limit
+				_, tasks = self._GetTasksPage(params, start, limit)
+				yield tasks
+
+	def IterTasks(self, params, parallel=False):
+		"""Generator version of GetTasks which yields the tasks of each page as soon as it arrives.
+		Without parallel, the next page is only requested once the current one has been consumed"""
+		params, keys = _ParamsAndKeys(params)
+		for page in self._IterTaskPages(params, parallel):
+			start = perf_counter()
+			tasks = _LoadTaskList(page, keys)
+			self.instrumentation.OnDecode("getTasksUrl", "objects", perf_counter() - start, len(tasks))
+			yield from tasks
+
+	def GetTasks(self, params, parallel=False):
+		"""Get the tasks filtered by the given params, which is either a dictionary of the API's parameters or a TaskQuery.
+		With parallel=True, the total from the first page is used to fetch the remaining pages concurrently"""
+		return list(self.IterTasks(params, parallel))
+
+	def _GetRawTasks(self, params, parallel):
+		rawTasks = []
+		for page in self._IterTaskPages(params, parallel):
+			rawTasks.extend(page)
+		return rawTasks
+
+	def GetTasksFrame(self, params, parallel=False):
+		"""Get the tasks as a pandas DataFrame with a column for each field in the response, decoded straight from the JSON without creating Task objects.
+		Ids and other integers are int64, with nullable integers for folderId and contextId. Dates and modified are datetime64 in UTC,
+		priority, dueDateModifier and status are categoricals of the enum names and tags are lists. Requires pandas"""
+		params, keys = _ParamsAndKeys(params)
+		rawTasks = self._GetRawTasks(params, parallel)
+		start = perf_counter()
+		frame = _TasksFrame(rawTasks, keys)
+		self.instrumentation.OnDecode("getTasksUrl", "frame", perf_counter() - start, len(rawTasks))
+		return frame
+
+	def GetTasksTable(self, params, parallel=False):
+		"""Get the tasks as a pyarrow Table, with the same columns as GetTasksFrame. The enums are dictionary arrays and tags are list arrays. Requires pyarrow"""
+		params, keys = _ParamsAndKeys(params)
+		rawTasks = self._GetRawTasks(params, parallel)
+		start = perf_counter()
+		table = _TasksTable(rawTasks, keys)
+		self.instrumentation.OnDecode("getTasksUrl", "frame", perf_counter() - start, len(rawTasks))
+		return table
+
+	def GetDeletedTasks(self, after):
+		"""Get the ids of the tasks deleted after the given datetime, or all the deleted tasks if after is None"""
+		deleted = self._GetJson(self.deletedTasksUrl, params={"after": int(after.timestamp()) if after is not None else 0})
+		# the first element contains the count
+		return [int(x["id"]) for x in deleted[1:]]
+
+	def AddTaskListener(self, listener):
+		"""Keep listener, such as a TaskStore, informed of the tasks written through this object.
+		listener.OnTasksChanged(tasks) is called with the added and edited tasks and listener.OnTasksDeleted(ids) with the deleted ids"""
+		self.taskListeners.append(listener)
+
+	def _PostTasks(self, url, payload):
+		# in the body rather than the query string, which servers limit in length
+		response = self._Post(url, data={"tasks": payload})
+		response.raise_for_status()
+		debug("Response: {},{}".format(response, response.text))
+		taskResponse = response.json()
+		# an error for the whole request comes back as a dictionary - per-task errors are entries in the list
+		if "errorCode" in taskResponse:
+			error("Toodledo error: {}".format(taskResponse))
+			raise ToodledoError(taskResponse["errorCode"])
+		return taskResponse
+
+	def _WriteTasks(self, url, taskList, encode, makeResult, parallel, raiseOnError, notify): # pylint: disable=too-many-arguments
 		limit = 50 # single request limit
-		start = 0
-		while True:
-			debug("Start: {}".format(start))
-			response = self._Session().post(Toodledo.deleteTasksUrl, params={"tasks": dumps(taskIdList[start:start + limit])})
-			response.raise_for_status()
-			if "errorCode" in response.json():
-				raise ToodledoError(response.json()["errorCode"])
-			if len(taskIdList[start:start + limit]) < limit:
-				break
-			start += limit
+		endpoint = self.endpointNames.get(url, url)
+		start = perf_counter()
+		chunks, payloads = _SizedChunks(taskList, encode(taskList), limit, self.maxPayloadBytes)
+		self.instrumentation.OnEncode(endpoint, perf_counter() - start, len(taskList))
+		outcomes = _RunBatches(payloads, partial(self._PostTasks, url), self.maxWorkers if parallel else 1)
+		start = perf_counter()
+		try:
+			return _CollectResults(chunks, outcomes, makeResult, raiseOnError, partial(notify, self.taskListeners))
+		finally:
+			self.instrumentation.OnDecode(endpoint, "objects", perf_counter() - start, len(taskList))
+
+	def EditTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Save the changes to the given tasks. Only the id and the attributes set since each task was loaded are sent and tasks without changes are skipped.
+		Each successfully edited task is marked clean. See AddTasks for the arguments and the result"""
+		debug("Total tasks to edit: {}".format(len(taskList)))
+		isDirty, dirtyTasks = _DirtyTasks(taskList)
+		results = self._WriteTasks(self.editTasksUrl, dirtyTasks, _TaskEncoder(dirtyOnly=True), partial(_EditResult, _TaskSchema()), parallel, raiseOnError, _NotifyEdited)
+		return _WithSkipped(taskList, isDirty, results)
+
+	def AddTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Add the given tasks and return a TaskWriteResult for each one, in the same order, containing the new id.
+		With parallel=True, the batches of 50 are sent concurrently. A failed batch doesn't stop the others - its tasks get the error
+		in their results and, with raiseOnError, the first such error is raised once all the batches are done"""
+		debug("Total tasks to add: {}".format(len(taskList)))
+		return self._WriteTasks(self.addTasksUrl, taskList, _TaskEncoder(), partial(_AddResult, _TaskSchema()), parallel, raiseOnError, _NotifyChanged)
+
+	def DeleteTasks(self, taskList, parallel=False, raiseOnError=True):
+		"""Delete the given tasks. See AddTasks for the arguments and the result"""
+		debug("Total tasks to delete: {}".format(len(taskList)))
+		return self._WriteTasks(self.deleteTasksUrl, taskList, lambda chunk: [str(task.id_) for task in chunk], _DeleteResult, parallel, raiseOnError, _NotifyDeleted)
+
+	def Reconcile(self, desiredTasks, key="id_", fields=None, currentTasks=None, delete=False, dryRun=False, parallel=False, raiseOnError=True): # pylint: disable=too-many-arguments
+		"""Add, edit and delete tasks so that the remote tasks match desiredTasks, and return the ReconcilePlan with the results.
+		key is the attribute name, or a function of a task, that matches desired tasks to remote ones - desired tasks with a key of None are added.
+		With delete, the remote tasks that no desired task matches are deleted, except those with a key of None. Only the attributes in fields, by default those set
+		on any of the desired tasks, are fetched and compared, and edits only send the ones that differ - read-only ones such as modified are never edited.
+		With a key function, fields has to be given and include everything that the function reads.
+		currentTasks, such as the tasks of an up to date TaskSync, saves fetching them. dryRun returns the plan without running it"""
+		fields = _Fields(desiredTasks, key, fields)
+		if currentTasks is None:
+			currentTasks = self.GetTasks(TaskQuery(fields=fields), parallel=parallel)
+		plan = _Plan(desiredTasks, currentTasks, key, fields, delete)
+		debug("Reconcile plan: {}".format(plan))
+		if not dryRun:
+			plan.addResults = self.AddTasks(plan.adds, parallel, raiseOnError)
+			plan.editResults = self.EditTasks(plan.edits, parallel, raiseOnError)
+			plan.deleteResults = self.DeleteTasks(plan.deletes, parallel, raiseOnError)
+		return plan
@@ -0,0 +1,279 @@
+"""Buffered task writes"""
+
+from collections import OrderedDict
+from logging import debug, exception, warning
+from pickle import dump, load, UnpicklingError
+from os import fsync
+from threading import Lock, Timer
+
+from .batch import TaskWriteResult
+from .cache import _taskCodec
+from .storage import _ReplaceFile
+from .task import Task
+
+def _Write(write, taskList):
+	"""Results of the write, with the exception in every result if the whole call failed"""
+	if len(taskList) == 0:
+		return []
+	try:
+		return write(taskList, raiseOnError=False)
+	except Exception as e: # pylint: disable=broad-except
+		return [TaskWriteResult(id_=getattr(x, "id_", None), exception=e) for x in taskList]
+
+def _Changes(task):
+	"""A task with the id and the given task's attributes, all of them dirty"""
+	return Task(**{name: getattr(task, name) for name in Task.fieldNames if hasattr(task, name)})
+
+def _Merge(changes, newer):
+	for name in newer.DirtyFields():
+		setattr(changes, name, getattr(newer, name))
+
+class WriteBehind: # pylint: disable=too-many-instance-attributes
+	"""Queues task adds, edits and deletes and sends them together. Edits to the same task are merged into one,
+	deleting a task that is still queued to be added cancels both, and edits to a task that is going to be deleted are dropped.
+	The queue is flushed once it holds batchSize writes, interval seconds after the first queued write, or when Flush is called.
+	With a journalPath, every queued write is appended to that file first and the queue is rebuilt from it when a
+	WriteBehind is created with the same path, so a crash before a flush doesn't lose anything. A crash during a flush
+	may send some writes twice"""
+
+	def __init__(self, toodledo, batchSize=50, interval=5.0, journalPath=None):
+		"""toodledo is a Toodledo object. interval of None means only batchSize and Flush trigger a flush"""
+		self.toodledo = toodledo
+		self.batchSize = batchSize
+		self.interval = interval
+		self.journalPath = journalPath
+		# sequence number to (snapshot, task passed to Add or None) - added tasks don't have an id yet
+		self.adds = OrderedDict()
+		# the sequence numbers of the queued Add calls by the id() of the task
+		self.addSeqs = {}
+		# task id to a task with the merged changes
+		self.edits = OrderedDict()
+		# task ids, as an ordered set
+		self.deletes = OrderedDict()
+		self.nextSeq = 0
+		# the id() of the tasks passed to Add whose adds are being sent, and the calls for them to make once they are done
+		self.sending = set()
+		self.deferred = []
+		self.lock = Lock()
+		# held for the whole of a flush so that flushes don't overlap
+		self.flushLock = Lock()
+		self.timer = None
+		if journalPath is not None:
+			self._Replay()
+
+	def __len__(self):
+		"""The number of queued writes"""
+		return len(self.adds) + len(self.edits) + len(self.deletes)
+
+	def _Replay(self):
+		try:
+			with open(self.journalPath, "rb") as f:
+				while True:
+					try:
+						record = load(f)
+					except (EOFError, UnpicklingError, ValueError, TypeError):
+						# the end, or a record cut short by a crash
+						break
+					self._Apply(record, None)
+		except FileNotFoundError:
+			return
+		debug("Replayed {} queued task writes".format(len(self)))
+
+	def _Apply(self, record, original):
+		kind = record[0]
+		if kind == "add":
+			_, seq, row = record
+			if original is None and seq in self.adds:
+				original = self.adds[seq][1]
+			self.adds[seq] = (_taskCodec.Decode(row), original)
+			self.nextSeq = max(self.nextSeq, seq + 1)
+			if original is not None:
+				self.addSeqs[id(original)] = seq
+		elif kind == "cancel":
+			_, original = self.adds.pop(record[1])
+			if original is not None:
+				del self.addSeqs[id(original)]
+		elif kind == "edit":
+			decoded = _taskCodec.Decode(record[1])
+			id_ = decoded.id_
+			if id_ in self.deletes:
+				return
+			if id_ in self.edits:
+				_Merge(self.edits[id_], _Changes(decoded))
+			else:
+				self.edits[id_] = _Changes(decoded)
+		else:
+			self.edits.pop(record[1], None)
+			self.deletes[record[1]] = None
+
+	@staticmethod
+	def _Dump(records, f):
+		for record in records:
+			dump(record, f, protocol=4)
+
+	def _Append(self, record):
+		with open(self.journalPath, "ab") as f:
+			WriteBehind._Dump([record], f)
+			f.flush()
+			fsync(f.fileno())
+
+	def _Queue(self, makeRecord):
+		# makeRecord runs under the lock, so that what it sees of the queue is still true when its record is applied.
+		# It returns the record and the task passed to Add or None, or None for nothing to queue
+		with self.lock:
+			made = makeRecord()
+			if made is None:
+				return None
+			record, original = made
+			if self.journalPath is not None:
+				self._Append(record)
+			self._Apply(record, original)
+			full = len(self) >= self.batchSize
+			if not full:
+				self._ScheduleFlush()
+		if full:
+			self.Flush()
+		return record
+
+	def _ScheduleFlush(self):
+		if self.interval is None or self.timer is not None or len(self) == 0:
+			return
+		self.timer = Timer(self.interval, self._TimedFlush)
+		self.timer.daemon = True
+		self.timer.start()
+
+	def _TimedFlush(self):
+		# nothing would see an exception raised on the timer's thread
+		try:
+			results = self.Flush()
+		except Exception: # pylint: disable=broad-except
+			exception("Flushing the queued task writes failed")
+			return
+		failures = [x for x in results if x.IsError()]
+		if len(failures) > 0:
+			warning("{} queued task writes failed, the first being {}".format(len(failures), failures[0]))
+
+	def _AddRecord(self, task):
+		seq = self.addSeqs.get(id(task))
+		if seq is None:
+			seq = self.nextSeq
+			self.nextSeq += 1
+		return ("add", seq, _taskCodec.Encode(task)), task
+
+	def Add(self, task):
+		"""Queue adding the task and mark it clean. Its id_ is set once it has been added. Adding it again before then replaces the queued copy"""
+		self._Queue(lambda: self._AddRecord(task))
+		task.MarkClean()
+
+	def Edit(self, task):
+		"""Queue the changes made to the task since it was loaded or last queued, and mark it clean.
+		For a task that is still queued to be added, the queued copy is replaced instead, and for one that is being added, the changes are queued once it has been"""
+		def _Make():
+			if id(task) in self.addSeqs:
+				return self._AddRecord(task)
+			if id(task) in self.sending:
+				self.deferred.append((self.Edit, task))
+				return None
+			if not hasattr(task, "id_"):
+				raise ValueError("Only tasks with an id can be edited - queue adding it with Add")
+			if not task.IsDirty():
+				return None
+			changes = Task(id_=task.id_, **{name: getattr(task, name) for name in task.DirtyFields()})
+			return ("edit", _taskCodec.Encode(changes)), None
+		if self._Queue(_Make) is not None:
+			task.MarkClean()
+
+	def Delete(self, task):
+		"""Queue deleting the task, or cancel adding it if that is still queued. For a task that is being added, the delete is queued once it has been"""
+		def _Make():
+			seq = self.addSeqs.get(id(task))
+			if seq is not None:
+				return ("cancel", seq), None
+			if id(task) in self.sending:
+				self.deferred.append((self.Delete, task))
+				return None
+			if not hasattr(task, "id_"):
+				raise ValueError("Only tasks with an id can be deleted")
+			return ("delete", task.id_), None
+		self._Queue(_Make)
+
+	def _Requeue(self, adds, edits, deletes):
+		for seq, entry in adds:
+			self.adds[seq] = entry
+			if entry[1] is not None:
+				self.addSeqs[id(entry[1])] = seq
+		for changes in edits:
+			if changes.id_ in self.deletes:
+				continue
+			# the changes queued since the flush started win
+			newer = self.edits.get(changes.id_)
+			if newer is not None:
+				_Merge(changes, newer)
+			self.edits[changes.id_] = changes
+		for id_ in deletes:
+			self.edits.pop(id_, None)
+			self.deletes[id_] = None
+
+	def _Compact(self):
+		# rewrite the journal with just what is still queued, then rename so that a crash never leaves a truncated journal behind
+		if self.journalPath is None:
+			return
+		records = [("add", seq, _taskCodec.Encode(task)) for seq, (task, _) in self.adds.items()]
+		records.extend(("edit", _taskCodec.Encode(changes)) for changes in self.edits.values())
+		records.extend(("delete", id_) for id_ in self.deletes)
+		_ReplaceFile(self.journalPath, lambda f: WriteBehind._Dump(records, f), binary=True)
+
+	def Flush(self):
+		"""Send everything that is queued - the adds, then the edits, then the deletes, in batches of up to 50 tasks.
+		Returns the TaskWriteResult of each write. Writes that the API rejected are dropped, while the ones in a batch that failed as a whole stay queued.
+		Edits and deletes made while a task was being added are dropped too if the API rejected the add, with a result carrying its errorCode"""
+		with self.flushLock:
+			with self.lock:
+				if self.timer is not None:
+					self.timer.cancel()
+					self.timer = None
+				adds = list(self.adds.items())
+				edits = list(self.edits.values())
+				deletes = list(self.deletes)
+				self.adds = OrderedDict()
+				self.addSeqs = {}
+				self.edits = OrderedDict()
+				self.deletes = OrderedDict()
+				self.sending = {id(original) for _, (_, original) in adds if original is not None}
+			addResults = _Write(self.toodledo.AddTasks, [task for _, (task, _) in adds])
+			editResults = _Write(self.toodledo.EditTasks, edits)
+			deleteResults = _Write(self.toodledo.DeleteTasks, [Task(id_=x) for x in deletes])
+			rejected = {}
+			for (_, (_, original)), result in zip(adds, addResults):
+				if original is None:
+					continue
+				if not result.IsError():
+					original.id_ = result.id_
+				elif result.exception is None:
+					rejected[id(original)] = result
+			with self.lock:
+				self._Requeue(
+					[x for x, result in zip(adds, addResults) if result.exception is not None],
+					[x for x, result in zip(edits, editResults) if result.exception is not None],
+					[x for x, result in zip(deletes, deleteResults) if result.exception is not None])
+				self._Compact()
+				self._ScheduleFlush()
+				self.sending = set()
+				# a task whose add was rejected has no id to edit or delete, unless it has been queued to be added again since
+				skipped = [TaskWriteResult(errorCode=rejected[id(task)].errorCode) for _, task in self.deferred
+					if id(task) in rejected and id(task) not in self.addSeqs]
+				deferred = [(queue, task) for queue, task in self.deferred if id(task) not in rejected or id(task) in self.addSeqs]
+				self.deferred = []
+		# outside the flush lock since these may flush again
+		for queue, task in deferred:
+			queue(task)
+		return addResults + editResults + deleteResults + skipped
+
+	def Close(self):
+		"""Flush and stop the timer"""
+		results = self.Flush()
+		with self.lock:
+			if self.timer is not None:
+				self.timer.cancel()
+				self.timer = None
+		return results